@@ -0,0 +1,98 @@
+"""
+Compara o armazenamento das paginas sem compressao, com gzip e com lzma.
+
+Para cada compressao, grava as mesmas paginas com escrever_em_arquivo e as
+le de volta com ler_arquivo, informando o tamanho em disco, a razao de
+compressao e a vazao (MB/s de JSON) de gravacao e de leitura.
+
+Uso, a partir da raiz do repositorio:
+
+    python -m benchmarks.compressao --paginas 200 --documentos 50
+"""
+from argparse import ArgumentParser
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from colecao.livros import escrever_em_arquivo, ler_arquivo
+
+
+AUTORES = [
+    "Luciano Ramalho", "Nilo Neil", "Allen B. Downey", "Kenneth Reitz",
+    "Wes McKinney", "Agatha Christie", "J K Rowlings",
+]
+PALAVRAS = [
+    "Python", "Fluente", "Introducao", "Programacao", "Pense", "Guia",
+    "Mochileiro", "Analise", "Dados", "Testes", "Dubles", "Assassinato",
+]
+
+
+def gerar_paginas(paginas, documentos, semente=0):
+    aleatorio = random.Random(semente)
+    total = paginas * documentos
+    return [
+        json.dumps({
+            "num_docs": total,
+            "docs": [
+                {"author": aleatorio.choice(AUTORES),
+                 "title": " ".join(aleatorio.choices(PALAVRAS, k=5))}
+                for _ in range(documentos)
+            ],
+        })
+        for _ in range(paginas)
+    ]
+
+
+def medir(paginas, compressao, diretorio):
+    arquivos = [
+        os.path.join(diretorio, f"pagina{i}.json")
+        for i in range(len(paginas))
+    ]
+    inicio = time.perf_counter()
+    for arquivo, conteudo in zip(arquivos, paginas):
+        escrever_em_arquivo(arquivo, conteudo, compressao=compressao)
+    gravacao = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for arquivo in arquivos:
+        ler_arquivo(arquivo)
+    leitura = time.perf_counter() - inicio
+    tamanho_json = sum(len(conteudo.encode()) for conteudo in paginas)
+    tamanho_em_disco = sum(os.path.getsize(arquivo) for arquivo in arquivos)
+    return {
+        "compressao": compressao or "nenhuma",
+        "bytes_json": tamanho_json,
+        "bytes_em_disco": tamanho_em_disco,
+        "razao": round(tamanho_json / tamanho_em_disco, 2),
+        "gravacao_mb_s": round(tamanho_json / gravacao / 1e6, 2),
+        "leitura_mb_s": round(tamanho_json / leitura / 1e6, 2),
+    }
+
+
+def main(argumentos=None):
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paginas", type=int, default=200)
+    parser.add_argument("--documentos", type=int, default=50)
+    parser.add_argument("--json", action="store_true",
+                        help="imprime o resultado em JSON")
+    argumentos = parser.parse_args(argumentos)
+    paginas = gerar_paginas(argumentos.paginas, argumentos.documentos)
+    resultados = []
+    for compressao in (None, "gzip", "lzma"):
+        with tempfile.TemporaryDirectory() as diretorio:
+            resultados.append(medir(paginas, compressao, diretorio))
+    if argumentos.json:
+        json.dump(resultados, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{'compressao':<10} {'em disco':>12} {'razao':>7} "
+          f"{'grava MB/s':>11} {'le MB/s':>9}")
+    for r in resultados:
+        print(f"{r['compressao']:<10} {r['bytes_em_disco']:>12} "
+              f"{r['razao']:>7} {r['gravacao_mb_s']:>11} {r['leitura_mb_s']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Mede consultar_livros, baixar_livros e registrar_livros contra um servidor local.
+
+Sobe um benchmarks.servidor.ServidorFalso, aponta ENDERECO_DO_BUSCADOR e
+Consulta.endereco para ele e informa, para cada funcao:
+    - paginas/s e latencia p50/p99 de cada requisicao
+    - documentos/s (registrar_livros)
+    - pico de memoria residente (RSS) do processo ao fim da etapa
+O resultado em JSON (--json ou --saida) inclui os parametros usados, para
+comparar execucoes de versoes diferentes.
+
+Uso, a partir da raiz do repositorio:
+
+    python -m benchmarks.desempenho --documentos 5000 --latencia 0.005 \\
+        --trabalhadores 8 --saida resultado.json
+"""
+from argparse import ArgumentParser
+from contextlib import contextmanager
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from benchmarks.servidor import DISTRIBUICOES, ServidorFalso
+from colecao import livros
+
+
+def percentil(valores, p):
+    """Percentil `p` (0 a 100) de `valores`, pelo posto mais proximo."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posto = max(1, -(-len(ordenados) * p // 100))
+    return ordenados[int(posto) - 1]
+
+
+def pico_de_memoria():
+    """Pico de memoria residente do processo em bytes, se disponivel."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+@contextmanager
+def cronometrar_requisicoes(latencias):
+    """Acrescenta a `latencias` a duracao de cada executar_requisicao."""
+    original = livros.executar_requisicao
+
+    def executar_requisicao(url, **opcoes):
+        inicio = time.perf_counter()
+        try:
+            return original(url, **opcoes)
+        finally:
+            latencias.append(time.perf_counter() - inicio)
+
+    livros.executar_requisicao = executar_requisicao
+    try:
+        yield
+    finally:
+        livros.executar_requisicao = original
+
+
+def resumo(nome, duracao, paginas, latencias, **extras):
+    return {
+        "funcao": nome,
+        "segundos": round(duracao, 4),
+        "paginas": paginas,
+        "paginas_s": round(paginas / duracao, 2) if duracao else None,
+        "latencia_p50_ms": arredondar_ms(percentil(latencias, 50)),
+        "latencia_p99_ms": arredondar_ms(percentil(latencias, 99)),
+        **extras,
+        "pico_rss_bytes": pico_de_memoria(),
+    }
+
+
+def arredondar_ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 3)
+
+
+def medir_consultar_livros(repeticoes):
+    latencias = []
+    respostas = 0
+    inicio = time.perf_counter()
+    with cronometrar_requisicoes(latencias):
+        for _ in range(repeticoes):
+            if livros.consultar_livros("Luciano Ramalho"):
+                respostas += 1
+    duracao = time.perf_counter() - inicio
+    return resumo("consultar_livros", duracao, respostas, latencias,
+                  erros=repeticoes - respostas)
+
+
+def medir_baixar_livros(servidor, diretorio, trabalhadores):
+    arquivos = [
+        os.path.join(diretorio, f"pagina{i}.json")
+        for i in range(servidor.total_de_paginas)
+    ]
+    latencias = []
+    inicio = time.perf_counter()
+    with cronometrar_requisicoes(latencias):
+        livros.baixar_livros(arquivos, None, None, "Python",
+                             trabalhadores=trabalhadores)
+    duracao = time.perf_counter() - inicio
+    gravados = [arquivo for arquivo in arquivos if os.path.exists(arquivo)]
+    return gravados, resumo("baixar_livros", duracao, len(gravados), latencias,
+                            erros=len(arquivos) - len(gravados),
+                            trabalhadores=trabalhadores)
+
+
+def medir_registrar_livros(arquivos):
+    # A latencia de cada pagina e o intervalo entre chamadas a
+    # inserir_registros: leitura do arquivo mais decodificacao do JSON.
+    latencias = []
+    anterior = time.perf_counter()
+
+    def inserir_registros(documentos):
+        nonlocal anterior
+        agora = time.perf_counter()
+        latencias.append(agora - anterior)
+        anterior = agora
+        return len(documentos)
+
+    inicio = anterior
+    documentos = livros.registrar_livros(arquivos, inserir_registros)
+    duracao = time.perf_counter() - inicio
+    return resumo("registrar_livros", duracao, len(arquivos), latencias,
+                  documentos=documentos,
+                  documentos_s=round(documentos / duracao, 2) if duracao else None)
+
+
+def executar(argumentos):
+    servidor = ServidorFalso(
+        documentos=argumentos.documentos,
+        documentos_por_pagina=argumentos.documentos_por_pagina,
+        palavras_por_titulo=argumentos.palavras_por_titulo,
+        latencia=argumentos.latencia,
+        distribuicao=argumentos.distribuicao,
+        taxa_de_erros=argumentos.taxa_de_erros,
+        semente=argumentos.semente,
+    )
+    endereco, buscador = livros.Consulta.endereco, livros.ENDERECO_DO_BUSCADOR
+    quantidade_por_pagina = livros.Resposta.quantidade_documentos_por_pagina
+    logging.disable(logging.CRITICAL)
+    try:
+        with servidor, tempfile.TemporaryDirectory() as diretorio:
+            livros.Consulta.endereco = servidor.url + "/buscarlivros"
+            livros.ENDERECO_DO_BUSCADOR = servidor.url + "/buscador"
+            livros.Resposta.quantidade_documentos_por_pagina = (
+                argumentos.documentos_por_pagina
+            )
+            resultados = [medir_consultar_livros(argumentos.repeticoes)]
+            arquivos, resultado = medir_baixar_livros(
+                servidor, diretorio, argumentos.trabalhadores
+            )
+            resultados.append(resultado)
+            resultados.append(medir_registrar_livros(arquivos))
+    finally:
+        logging.disable(logging.NOTSET)
+        livros.Consulta.endereco, livros.ENDERECO_DO_BUSCADOR = endereco, buscador
+        livros.Resposta.quantidade_documentos_por_pagina = quantidade_por_pagina
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {
+            nome: valor for nome, valor in vars(argumentos).items()
+            if nome not in ("json", "saida")
+        },
+        "requisicoes_ao_servidor": servidor.requisicoes,
+        "resultados": resultados,
+    }
+
+
+def main(argumentos=None):
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documentos", type=int, default=2000,
+                        help="documentos da consulta baixada")
+    parser.add_argument("--documentos-por-pagina", type=int, default=50)
+    parser.add_argument("--palavras-por-titulo", type=int, default=5)
+    parser.add_argument("--latencia", type=float, default=0.0,
+                        help="latencia mediana do servidor, em segundos")
+    parser.add_argument("--distribuicao", choices=DISTRIBUICOES,
+                        default="lognormal")
+    parser.add_argument("--taxa-de-erros", type=float, default=0.0,
+                        help="fracao das respostas que sao 503")
+    parser.add_argument("--repeticoes", type=int, default=100,
+                        help="chamadas de consultar_livros")
+    parser.add_argument("--trabalhadores", type=int, default=4)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--json", action="store_true",
+                        help="imprime o resultado em JSON")
+    parser.add_argument("--saida", help="grava o resultado em JSON neste arquivo")
+    argumentos = parser.parse_args(argumentos)
+    relatorio = executar(argumentos)
+    if argumentos.saida:
+        with open(argumentos.saida, "w") as fp:
+            json.dump(relatorio, fp, indent=2)
+    if argumentos.json:
+        json.dump(relatorio, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{'funcao':<17} {'paginas/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'docs/s':>10} {'erros':>6} {'pico RSS MB':>12}")
+    for r in relatorio["resultados"]:
+        rss = r["pico_rss_bytes"]
+        print(f"{r['funcao']:<17} {r['paginas_s'] or '-':>10} "
+              f"{r['latencia_p50_ms'] or '-':>8} {r['latencia_p99_ms'] or '-':>8} "
+              f"{r.get('documentos_s') or '-':>10} {r.get('erros', '-'):>6} "
+              f"{round(rss / 2 ** 20, 1) if rss else '-':>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Servidor HTTP local que imita o servico de busca de livros.
+
+Responde a qualquer caminho com a pagina pedida em ?page=, no formato de
+Resposta ({"num_docs": ..., "docs": [...]}). O total de documentos, os
+documentos por pagina, o tamanho dos titulos, a latencia e a taxa de erros
+(503) sao configuraveis; com a mesma semente, o conteudo e o mesmo.
+
+Uso:
+
+    with ServidorFalso(documentos=1000, latencia=0.01) as servidor:
+        Consulta.endereco = servidor.url + "/buscarlivros"
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import json
+import random
+import threading
+import time
+
+from benchmarks.compressao import AUTORES, PALAVRAS
+
+
+DISTRIBUICOES = ("fixa", "exponencial", "lognormal")
+
+
+class ServidorFalso:
+    """
+    Servidor em segundo plano, em 127.0.0.1 numa porta livre:
+        - documentos: total de documentos de cada consulta
+        - documentos_por_pagina e palavras_por_titulo: tamanho das paginas
+        - latencia: atraso mediano de cada resposta, em segundos, sorteado
+          conforme `distribuicao` (fixa, exponencial ou lognormal)
+        - taxa_de_erros: fracao das respostas que sao 503
+    `requisicoes` e `erros` contam o que foi atendido.
+    """
+
+    def __init__(self, documentos=1000, documentos_por_pagina=50,
+                 palavras_por_titulo=5, latencia=0.0, distribuicao="fixa",
+                 taxa_de_erros=0.0, semente=0):
+        if distribuicao not in DISTRIBUICOES:
+            raise ValueError(f"Distribuicao invalida: {distribuicao}.")
+        self.documentos = documentos
+        self.documentos_por_pagina = documentos_por_pagina
+        self.palavras_por_titulo = palavras_por_titulo
+        self.latencia = latencia
+        self.distribuicao = distribuicao
+        self.taxa_de_erros = taxa_de_erros
+        self.semente = semente
+        self.requisicoes = 0
+        self.erros = 0
+        self._aleatorio = random.Random(semente)
+        self._trava = threading.Lock()
+        self._paginas = {}
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._manipulador())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    @property
+    def total_de_paginas(self):
+        return -(-self.documentos // self.documentos_por_pagina)
+
+    def pagina(self, numero):
+        """Corpo JSON (bytes) da pagina `numero`, igual em toda requisicao."""
+        with self._trava:
+            corpo = self._paginas.get(numero)
+            if corpo is None:
+                aleatorio = random.Random(f"{self.semente}-{numero}")
+                inicio = (numero - 1) * self.documentos_por_pagina
+                quantidade = max(0, min(self.documentos_por_pagina,
+                                        self.documentos - inicio))
+                corpo = json.dumps({
+                    "num_docs": self.documentos,
+                    "docs": [
+                        {"author": aleatorio.choice(AUTORES),
+                         "title": " ".join(aleatorio.choices(
+                             PALAVRAS, k=self.palavras_por_titulo))}
+                        for _ in range(quantidade)
+                    ],
+                }).encode()
+                self._paginas[numero] = corpo
+            return corpo
+
+    def sortear(self):
+        """Retorna (atraso, erro) para a proxima resposta."""
+        with self._trava:
+            self.requisicoes += 1
+            erro = self._aleatorio.random() < self.taxa_de_erros
+            if erro:
+                self.erros += 1
+            if not self.latencia or self.distribuicao == "fixa":
+                atraso = self.latencia
+            elif self.distribuicao == "exponencial":
+                atraso = self._aleatorio.expovariate(1 / self.latencia)
+            else:
+                atraso = self.latencia * self._aleatorio.lognormvariate(0, 0.5)
+        return atraso, erro
+
+    def _manipulador(self):
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parametros = parse_qs(urlsplit(self.path).query)
+                numero = int(parametros.get("page", ["1"])[0])
+                atraso, erro = servidor.sortear()
+                if atraso:
+                    time.sleep(atraso)
+                if erro:
+                    self.send_error(503)
+                    return
+                corpo = servidor.pagina(numero)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *argumentos):
+                pass
+
+        return Manipulador
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, param1, param2, param3):
+        self.parar()
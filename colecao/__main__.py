@@ -0,0 +1,6 @@
+import sys
+
+from colecao.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,163 @@
+from asyncio import open_connection
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+from urllib.error import HTTPError, URLError
+from http.client import parse_headers
+import asyncio
+import io
+import logging
+
+from colecao import livros
+from colecao.limites import limitador_global
+from colecao.livros import (Consulta,
+                            Resposta,
+                            escrever_em_arquivo,
+                            obter_url,
+                            preparar_dados_para_requisicao,
+                            )
+
+
+CONCORRENCIA_PADRAO = 100
+
+
+async def consultar_livros_async(autor):
+    dados = preparar_dados_para_requisicao(autor)
+    url = obter_url(livros.ENDERECO_DO_BUSCADOR, dados)
+    ret = await executar_requisicao_async(url)
+    return ret
+
+
+async def executar_requisicao_async(url, semaforo=None, limitador=None):
+    """
+    Equivalente assincrono de executar_requisicao.
+
+    Respostas fora de 2xx sao HTTPError: o erro e registrado e o retorno e
+    None. Falhas de conexao e o timeout de 10 s levantam URLError. O corpo
+    e decodificado com o charset do Content-Type, ou utf-8. Com um
+    `semaforo`, a requisicao aguarda uma vaga nele.
+    """
+    if semaforo is None:
+        semaforo = nullcontext()
+    limitador = limitador or limitador_global()
+    if limitador:
+        await limitador.aguardar_async(url)
+    try:
+        async with semaforo:
+            status, motivo, cabecalhos, corpo = await asyncio.wait_for(
+                requisitar(url), timeout=10
+            )
+    except (OSError, asyncio.TimeoutError) as e:
+        raise URLError(e) from e
+    try:
+        if not 200 <= status < 300:
+            raise HTTPError(url, status, motivo, cabecalhos, io.BytesIO(corpo))
+    except HTTPError as e:
+        logging.exception(f"Ao acessar {url}: {e}")
+    else:
+        return corpo.decode(cabecalhos.get_content_charset() or "utf-8")
+
+
+async def requisitar(url):
+    """
+    Executa um GET HTTP/1.1 sobre asyncio.open_connection.
+
+    Retorna (status, motivo, cabecalhos, corpo).
+    """
+    partes = urlsplit(url)
+    https = partes.scheme == "https"
+    porta = partes.port or (443 if https else 80)
+    caminho = partes.path or "/"
+    if partes.query:
+        caminho += "?" + partes.query
+    leitor, escritor = await open_connection(
+        partes.hostname, porta, ssl=True if https else None
+    )
+    try:
+        pedido = (
+            f"GET {caminho} HTTP/1.1\r\n"
+            f"Host: {partes.netloc}\r\n"
+            "Accept: application/json\r\n"
+            "Connection: close\r\n"
+            "\r\n"
+        )
+        escritor.write(pedido.encode("latin-1"))
+        await escritor.drain()
+        linha_de_status = await leitor.readline()
+        _, status, *motivo = linha_de_status.decode("latin-1").split(" ", 2)
+        motivo = motivo[0].strip() if motivo else ""
+        cabecalhos = parse_headers(io.BytesIO(await ler_cabecalhos(leitor)))
+        corpo = await ler_corpo(leitor, cabecalhos)
+    finally:
+        escritor.close()
+        try:
+            await escritor.wait_closed()
+        except OSError:
+            pass
+    return int(status), motivo, cabecalhos, corpo
+
+
+async def ler_cabecalhos(leitor):
+    linhas = []
+    while True:
+        linha = await leitor.readline()
+        linhas.append(linha)
+        if linha in (b"\r\n", b"\n", b""):
+            return b"".join(linhas)
+
+
+async def ler_corpo(leitor, cabecalhos):
+    if cabecalhos.get("Transfer-Encoding", "").lower() == "chunked":
+        partes = []
+        while True:
+            tamanho = int((await leitor.readline()).split(b";")[0], 16)
+            if tamanho == 0:
+                await ler_cabecalhos(leitor)
+                return b"".join(partes)
+            partes.append(await leitor.readexactly(tamanho))
+            await leitor.readline()
+    tamanho = cabecalhos.get("Content-Length")
+    if tamanho is not None:
+        return await leitor.readexactly(int(tamanho))
+    return await leitor.read()
+
+
+async def baixar_livros_async(arquivo, autor, titulo, livre,
+                              concorrencia=CONCORRENCIA_PADRAO):
+    """
+    Equivalente assincrono de baixar_livros.
+
+    As paginas seguintes a primeira resposta valida sao requisitadas ao
+    mesmo tempo, limitadas a `concorrencia` requisicoes em andamento.
+    """
+    consulta = Consulta(autor, titulo, livre)
+    semaforo = asyncio.Semaphore(concorrencia)
+    total_de_paginas = 1
+    i = 0
+    while True:
+        resultado = await executar_requisicao_async(consulta.seguinte, semaforo)
+        if resultado:
+            resposta = Resposta(resultado)
+            total_de_paginas = resposta.total_de_paginas
+            await escrever_em_arquivo_async(arquivo[i], resultado)
+            break
+        elif consulta.pagina == 1:
+            total_de_paginas = 2
+        if consulta.pagina == total_de_paginas:
+            return
+        i += 1
+    await asyncio.gather(*[
+        baixar_pagina_async(arquivo, indice, consulta.seguinte, semaforo)
+        for indice in range(consulta.pagina, total_de_paginas)
+    ])
+
+
+async def baixar_pagina_async(arquivo, indice, url, semaforo):
+    resultado = await executar_requisicao_async(url, semaforo)
+    if resultado:
+        await escrever_em_arquivo_async(arquivo[indice], resultado)
+    return resultado
+
+
+async def escrever_em_arquivo_async(arquivo, conteudo):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, escrever_em_arquivo, arquivo, conteudo)
@@ -0,0 +1,199 @@
+from collections import OrderedDict
+from hashlib import sha256
+import os
+import threading
+import time
+
+
+class CacheEmDisco:
+    """
+    Corpos de resposta gravados em disco, indexados pela URL:
+        - cada entrada expira `ttl` segundos depois de gravada
+        - o total gravado fica abaixo de `tamanho_maximo` bytes,
+          descartando primeiro as entradas usadas ha mais tempo (LRU)
+        - acertos e falhas sao contados em `estatisticas`
+    """
+
+    sufixo = ".cache"
+
+    def __init__(self, diretorio, ttl=24 * 60 * 60,
+                 tamanho_maximo=256 * 1024 * 1024):
+        self._diretorio = diretorio
+        self._ttl = ttl
+        self._tamanho_maximo = tamanho_maximo
+        self._entradas = OrderedDict()
+        self._tamanho_total = 0
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        os.makedirs(diretorio, exist_ok=True)
+        self._carregar()
+
+    def obter(self, url):
+        """Retorna o conteudo guardado para `url` ou None."""
+        nome = self._nome(url)
+        with self._trava:
+            entrada = self._entradas.get(nome)
+            if entrada and time.time() - entrada[1] > self._ttl:
+                self._remover(nome)
+                entrada = None
+            if entrada is None:
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(nome)
+            self.acertos += 1
+        try:
+            with open(self._caminho(nome), "rb") as fp:
+                return fp.read().decode()
+        except OSError:
+            # Outra thread pode ter descartado ou regravado a entrada
+            # enquanto o arquivo era lido fora da trava.
+            with self._trava:
+                if self._entradas.get(nome) is entrada:
+                    self._remover(nome)
+            return None
+
+    def guardar(self, url, conteudo):
+        nome = self._nome(url)
+        dados = conteudo.encode()
+        caminho = self._caminho(nome)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(temporario, "wb") as fp:
+            fp.write(dados)
+        os.replace(temporario, caminho)
+        with self._trava:
+            if nome in self._entradas:
+                self._tamanho_total -= self._entradas.pop(nome)[0]
+            self._entradas[nome] = (len(dados), time.time())
+            self._tamanho_total += len(dados)
+            while self._tamanho_total > self._tamanho_maximo and self._entradas:
+                self._remover(next(iter(self._entradas)))
+
+    def limpar(self):
+        with self._trava:
+            for nome in list(self._entradas):
+                self._remover(nome)
+
+    @property
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "entradas": len(self._entradas),
+                "bytes": self._tamanho_total,
+            }
+
+    def _nome(self, url):
+        return sha256(url.encode()).hexdigest()
+
+    def _caminho(self, nome):
+        return os.path.join(self._diretorio, nome + self.sufixo)
+
+    def _remover(self, nome):
+        entrada = self._entradas.pop(nome, None)
+        if entrada is None:
+            return
+        self._tamanho_total -= entrada[0]
+        try:
+            os.remove(self._caminho(nome))
+        except FileNotFoundError:
+            pass
+
+    def _carregar(self):
+        """Reconstroi o indice a partir dos arquivos, do mais antigo ao mais novo."""
+        encontrados = []
+        for entrada in os.scandir(self._diretorio):
+            if entrada.name.endswith(self.sufixo):
+                info = entrada.stat()
+                encontrados.append((info.st_mtime, entrada.name, info.st_size))
+        for criado_em, arquivo, tamanho in sorted(encontrados):
+            self._entradas[arquivo[:-len(self.sufixo)]] = (tamanho, criado_em)
+            self._tamanho_total += tamanho
+
+
+class CacheEmMemoria:
+    """
+    Resultados em memoria, indexados por chave:
+        - no maximo `capacidade` entradas, descartando a usada ha mais tempo
+        - cada entrada expira `ttl` segundos depois de calculada
+        - chamadas simultaneas para a mesma chave aguardam um unico calculo
+    Resultados None nao sao guardados.
+    """
+
+    def __init__(self, capacidade=1024, ttl=5 * 60):
+        self._capacidade = capacidade
+        self._ttl = ttl
+        self._entradas = OrderedDict()
+        self._em_andamento = {}
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.agrupadas = 0
+        self.descartadas = 0
+
+    def obter(self, chave, calcular):
+        """Retorna o valor de `chave`, chamando calcular() se necessario."""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada and time.monotonic() - entrada[1] <= self._ttl:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[0]
+            if entrada:
+                del self._entradas[chave]
+            chamada = self._em_andamento.get(chave)
+            calcula = chamada is None
+            if calcula:
+                chamada = self._em_andamento[chave] = _Chamada()
+                self.falhas += 1
+            else:
+                self.agrupadas += 1
+        if not calcula:
+            return chamada.aguardar()
+        try:
+            chamada.valor = calcular()
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._trava:
+                del self._em_andamento[chave]
+                if chamada.erro is None and chamada.valor is not None:
+                    self._guardar(chave, chamada.valor)
+            chamada.concluida.set()
+        return chamada.valor
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+
+    @property
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "agrupadas": self.agrupadas,
+                "descartadas": self.descartadas,
+                "entradas": len(self._entradas),
+            }
+
+    def _guardar(self, chave, valor):
+        self._entradas[chave] = (valor, time.monotonic())
+        while len(self._entradas) > self._capacidade:
+            self._entradas.popitem(last=False)
+            self.descartadas += 1
+
+
+class _Chamada:
+    def __init__(self):
+        self.concluida = threading.Event()
+        self.valor = None
+        self.erro = None
+
+    def aguardar(self):
+        self.concluida.wait()
+        if self.erro is not None:
+            raise self.erro
+        return self.valor
@@ -0,0 +1,300 @@
+"""
+Linha de comando do pacote: colecao (ou python -m colecao).
+
+    colecao baixar --livre Python --destino paginas/ --trabalhadores 8
+    colecao baixar --lote consultas.tsv --destino paginas/ --layout segmentos
+    colecao registrar paginas/ --indice livros.db --deduplicar exato
+    colecao consultar --indice livros.db --autor "Luciano Ramalho"
+
+Os modulos de download e registro so sao importados pelo subcomando que
+os usa, para que invocacoes simples (--help, consultar) iniciem rapido.
+"""
+from argparse import ArgumentParser
+import json
+import os
+import sys
+import time
+
+
+EXTENSOES = {None: "", "gzip": ".gz", "lzma": ".xz"}
+
+
+class Progresso:
+    """Mostra em `saida` o andamento e a vazao de uma execucao."""
+
+    def __init__(self, unidade, saida=None, silencioso=False):
+        self.unidade = unidade
+        self.saida = saida or sys.stderr
+        self.silencioso = silencioso
+        self.quantidade = 0
+        self.inicio = time.perf_counter()
+        self._interativo = self.saida.isatty()
+
+    @property
+    def vazao(self):
+        duracao = time.perf_counter() - self.inicio
+        return self.quantidade / duracao if duracao else 0.0
+
+    def avancar(self, quantidade=1, detalhe=""):
+        self.quantidade += quantidade
+        if self.silencioso:
+            return
+        linha = f"{self.quantidade} {self.unidade} ({self.vazao:.1f}/s) {detalhe}"
+        if self._interativo:
+            self.saida.write("\r\x1b[K" + linha)
+        else:
+            self.saida.write(linha + "\n")
+        self.saida.flush()
+
+    def concluir(self, mensagem=""):
+        if self.silencioso:
+            return
+        duracao = time.perf_counter() - self.inicio
+        if self._interativo:
+            self.saida.write("\n")
+        self.saida.write(
+            f"{self.quantidade} {self.unidade} em {duracao:.2f} s "
+            f"({self.vazao:.1f} {self.unidade}/s){mensagem}\n"
+        )
+
+
+def ler_especificacoes(argumentos):
+    """(autor, titulo, livre) da linha de comando e do arquivo --lote."""
+    especificacoes = []
+    if argumentos.autor or argumentos.titulo or argumentos.livre:
+        especificacoes.append(
+            (argumentos.autor, argumentos.titulo, argumentos.livre)
+        )
+    if argumentos.lote:
+        with open(argumentos.lote, encoding="utf-8") as fp:
+            for linha in fp:
+                if not linha.strip() or linha.startswith("#"):
+                    continue
+                campos = linha.rstrip("\n").split("\t")
+                autor, titulo, livre = (campos + ["", "", ""])[:3]
+                especificacoes.append((autor, titulo, livre))
+    return especificacoes
+
+
+def opcoes_de_requisicao(argumentos):
+    """Opcoes para executar_requisicao; define o limitador global com --taxa."""
+    opcoes = {}
+    if argumentos.taxa:
+        from colecao.limites import LimitadorDeTaxa, definir_limitador_global
+        definir_limitador_global(
+            LimitadorDeTaxa(argumentos.taxa, rajada=argumentos.rajada)
+        )
+    if argumentos.cache:
+        from colecao.cache import CacheEmDisco
+        opcoes["cache"] = CacheEmDisco(argumentos.cache, ttl=argumentos.cache_ttl)
+    if argumentos.tentativas > 1:
+        from colecao.resiliencia import PoliticaDeRetentativa
+        opcoes["politica"] = PoliticaDeRetentativa(argumentos.tentativas)
+    if argumentos.conexoes:
+        from colecao.conexoes import PoolDeConexoes
+        opcoes["pool"] = PoolDeConexoes(maximo_por_host=argumentos.conexoes)
+    if argumentos.sem_compressao:
+        opcoes["aceitar_compressao"] = False
+    return opcoes
+
+
+def baixar(argumentos):
+    from colecao.lote import baixar_lote
+
+    especificacoes = ler_especificacoes(argumentos)
+    if not especificacoes:
+        raise SystemExit("Informe --autor, --titulo, --livre ou --lote.")
+    opcoes = opcoes_de_requisicao(argumentos)
+    progresso = Progresso("paginas", silencioso=argumentos.silencioso)
+
+    def avancar(estado):
+        total = estado.total_de_paginas or "?"
+        progresso.avancar(
+            detalhe=f"{estado.chave}: {estado.baixadas + estado.falhas}/{total}"
+        )
+
+    armazem = escritor = None
+    if argumentos.layout == "segmentos":
+        from colecao.segmentos import ArmazemDeSegmentos
+        armazem = ArmazemDeSegmentos(argumentos.destino)
+        arquivo = None
+    else:
+        from colecao.escrita import EscritorDeArquivos
+        escritor = EscritorDeArquivos(compressao=argumentos.compressao)
+        extensao = ".json" + EXTENSOES[argumentos.compressao]
+
+        def arquivo(chave, pagina):
+            return os.path.join(argumentos.destino, chave,
+                                f"pagina{pagina:05d}{extensao}")
+    try:
+        andamento = baixar_lote(
+            especificacoes, arquivo=arquivo, trabalhadores=argumentos.trabalhadores,
+            escritor=escritor, armazem=armazem, progresso=avancar, **opcoes
+        )
+    finally:
+        if escritor:
+            escritor.fechar()
+        if armazem is not None:
+            armazem.fechar()
+        if "pool" in opcoes:
+            opcoes["pool"].fechar()
+    falhas = sum(estado.falhas for estado in andamento.values())
+    erros = escritor.erros if escritor else 0
+    progresso.concluir(
+        f", {len(andamento)} consultas, {falhas} falhas, {erros} erros de gravacao"
+    )
+    return 1 if falhas or erros else 0
+
+
+def arquivos_de_paginas(caminhos):
+    """Arquivos de pagina em `caminhos`; diretorios sao percorridos em ordem."""
+    for caminho in caminhos:
+        if not os.path.isdir(caminho):
+            yield caminho
+            continue
+        for raiz, diretorios, nomes in os.walk(caminho):
+            diretorios.sort()
+            for nome in sorted(nomes):
+                if ".json" in nome and not nome.endswith(".tmp"):
+                    yield os.path.join(raiz, nome)
+
+
+def registrar(argumentos):
+    from colecao.livros import registrar_livros
+
+    if len(argumentos.caminhos) == 1 and os.path.exists(
+        os.path.join(argumentos.caminhos[0], "indice.tsv")
+    ):
+        from colecao.segmentos import ArmazemDeSegmentos
+        origem = ArmazemDeSegmentos(argumentos.caminhos[0])
+    else:
+        origem = arquivos_de_paginas(argumentos.caminhos)
+    deduplicador = None
+    if argumentos.deduplicar == "exato":
+        from colecao.deduplicacao import ConjuntoDeImpressoes
+        deduplicador = ConjuntoDeImpressoes()
+    elif argumentos.deduplicar == "bloom":
+        from colecao.deduplicacao import FiltroDeBloom
+        deduplicador = FiltroDeBloom(caminho=argumentos.filtro)
+    if argumentos.indice:
+        from colecao.indice import IndiceDeLivros
+        destino = IndiceDeLivros(argumentos.indice)
+        inserir = destino.inserir_registros
+    else:
+        destino = None
+        saida = sys.stdout
+
+        def inserir(documentos):
+            quantidade = 0
+            for documento in documentos:
+                saida.write(json.dumps(documento, ensure_ascii=False) + "\n")
+                quantidade += 1
+            return quantidade
+    progresso = Progresso("documentos", silencioso=argumentos.silencioso)
+
+    def inserir_registros(documentos):
+        quantidade = inserir(documentos)
+        progresso.avancar(quantidade)
+        return quantidade
+
+    try:
+        registrar_livros(origem, inserir_registros,
+                         tamanho_do_lote=argumentos.tamanho_do_lote,
+                         trabalhadores=argumentos.trabalhadores,
+                         deduplicador=deduplicador)
+    finally:
+        if destino is not None:
+            destino.fechar()
+        if deduplicador is not None:
+            deduplicador.salvar()
+        if hasattr(origem, "fechar"):
+            origem.fechar()
+    descartados = deduplicador.descartados if deduplicador is not None else 0
+    progresso.concluir(f", {descartados} duplicados")
+    return 0
+
+
+def consultar(argumentos):
+    if argumentos.indice:
+        from colecao.indice import IndiceDeLivros
+        with IndiceDeLivros(argumentos.indice) as indice:
+            documentos = indice.buscar(autor=argumentos.autor,
+                                       titulo=argumentos.titulo,
+                                       limite=argumentos.limite)
+        for documento in documentos:
+            print(json.dumps(documento, ensure_ascii=False))
+        return 0 if documentos else 1
+    if not argumentos.autor:
+        raise SystemExit("Sem --indice, a consulta ao servico exige --autor.")
+    from colecao.livros import consultar_livros
+    resultado = consultar_livros(argumentos.autor,
+                                 **opcoes_de_requisicao(argumentos))
+    if resultado is None:
+        return 1
+    print(resultado)
+    return 0
+
+
+def adicionar_opcoes_de_requisicao(parser):
+    parser.add_argument("--taxa", type=float,
+                        help="requisicoes por segundo por host")
+    parser.add_argument("--rajada", type=int, default=1)
+    parser.add_argument("--cache", help="diretorio do cache de respostas")
+    parser.add_argument("--cache-ttl", type=float, default=24 * 60 * 60,
+                        help="validade do cache, em segundos")
+    parser.add_argument("--tentativas", type=int, default=1,
+                        help="tentativas por requisicao, com espera exponencial")
+    parser.add_argument("--conexoes", type=int,
+                        help="reaproveita ate N conexoes por host")
+    parser.add_argument("--sem-compressao", action="store_true",
+                        help="nao pede respostas com gzip ou deflate")
+
+
+def criar_parser():
+    parser = ArgumentParser(prog="colecao", description=__doc__.splitlines()[1])
+    subcomandos = parser.add_subparsers(dest="subcomando", required=True)
+
+    parser_baixar = subcomandos.add_parser("baixar", help="baixa as paginas de consultas")
+    parser_baixar.add_argument("--autor")
+    parser_baixar.add_argument("--titulo")
+    parser_baixar.add_argument("--livre")
+    parser_baixar.add_argument("--lote",
+                               help="arquivo com autor<TAB>titulo<TAB>livre por linha")
+    parser_baixar.add_argument("--destino", required=True)
+    parser_baixar.add_argument("--layout", choices=("arquivos", "segmentos"),
+                               default="arquivos",
+                               help="um arquivo por pagina ou ArmazemDeSegmentos")
+    parser_baixar.add_argument("--compressao", choices=("gzip", "lzma"))
+    parser_baixar.add_argument("--trabalhadores", type=int, default=4)
+    parser_baixar.add_argument("--silencioso", action="store_true")
+    adicionar_opcoes_de_requisicao(parser_baixar)
+    parser_baixar.set_defaults(executar=baixar)
+
+    parser_registrar = subcomandos.add_parser("registrar",
+                                              help="registra os documentos baixados")
+    parser_registrar.add_argument("caminhos", nargs="+",
+                                  help="arquivos, diretorios ou um diretorio de segmentos")
+    parser_registrar.add_argument("--indice",
+                                  help="indice SQLite; sem ele, JSON Lines na saida")
+    parser_registrar.add_argument("--deduplicar", choices=("exato", "bloom"))
+    parser_registrar.add_argument("--filtro",
+                                  help="arquivo do filtro de Bloom entre execucoes")
+    parser_registrar.add_argument("--trabalhadores", type=int)
+    parser_registrar.add_argument("--tamanho-do-lote", type=int)
+    parser_registrar.add_argument("--silencioso", action="store_true")
+    parser_registrar.set_defaults(executar=registrar)
+
+    parser_consultar = subcomandos.add_parser("consultar",
+                                              help="consulta o indice local ou o servico")
+    parser_consultar.add_argument("--autor")
+    parser_consultar.add_argument("--titulo")
+    parser_consultar.add_argument("--indice", help="indice SQLite criado por registrar")
+    parser_consultar.add_argument("--limite", type=int)
+    adicionar_opcoes_de_requisicao(parser_consultar)
+    parser_consultar.set_defaults(executar=consultar)
+    return parser
+
+
+def main(argumentos=None):
+    argumentos = criar_parser().parse_args(argumentos)
+    return argumentos.executar(argumentos)
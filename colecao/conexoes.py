@@ -0,0 +1,200 @@
+from http.client import (HTTPConnection,
+                         HTTPSConnection,
+                         CannotSendRequest,
+                         RemoteDisconnected,
+                         )
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request
+import io
+import threading
+import time
+
+
+# Erros que indicam que o servidor fechou uma conexao mantida aberta.
+ERROS_DE_CONEXAO_QUEBRADA = (
+    RemoteDisconnected,
+    CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+# Redirecionamentos seguidos, como no HTTPRedirectHandler de urlopen.
+REDIRECIONAMENTOS = (301, 302, 303, 307, 308)
+MAXIMO_DE_REDIRECIONAMENTOS = 10
+
+
+class RespostaDoPool:
+    """Resposta ja lida, com a mesma interface usada de urlopen."""
+
+    def __init__(self, url, status, motivo, cabecalhos, corpo):
+        self.url = url
+        self.status = status
+        self.reason = motivo
+        self.headers = cabecalhos
+        self._corpo = corpo
+
+    def read(self, tamanho=-1):
+        if tamanho is None or tamanho < 0:
+            corpo, self._corpo = self._corpo, b""
+        else:
+            corpo, self._corpo = self._corpo[:tamanho], self._corpo[tamanho:]
+        return corpo
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, param1, param2, param3):
+        pass
+
+
+class PoolDeConexoes:
+    """
+    Conexoes http.client persistentes (keep-alive), agrupadas por host:
+        - no maximo `maximo_por_host` conexoes abertas por host
+        - conexoes ociosas ha mais de `ociosidade_maxima` segundos sao
+          descartadas
+        - uma conexao reaproveitada que o servidor fechou e refeita uma vez
+        - falhas ao conectar ou enviar o pedido viram URLError, como em
+          urlopen
+        - redirecionamentos (301, 302, 303, 307 e 308) sao seguidos, ate
+          MAXIMO_DE_REDIRECIONAMENTOS, como em urlopen; os demais status
+          fora de 2xx viram HTTPError
+    """
+
+    def __init__(self, maximo_por_host=4, ociosidade_maxima=60.0, timeout=10):
+        self._maximo_por_host = maximo_por_host
+        self._ociosidade_maxima = ociosidade_maxima
+        self._timeout = timeout
+        self._livres = {}
+        self._abertas = {}
+        self._condicao = threading.Condition()
+
+    def abrir(self, url, timeout=None):
+        """
+        Executa um GET em `url` (str ou Request) e retorna RespostaDoPool.
+        `timeout`, se informado, substitui o do pool nesta requisicao.
+        """
+        if timeout is None:
+            timeout = self._timeout
+        cabecalhos = {}
+        if isinstance(url, Request):
+            cabecalhos = dict(url.header_items())
+            url = url.full_url
+        for _ in range(MAXIMO_DE_REDIRECIONAMENTOS + 1):
+            status, motivo, cabecalhos_da_resposta, corpo = self._requisitar(
+                url, cabecalhos, timeout
+            )
+            destino = cabecalhos_da_resposta.get("Location")
+            if status not in REDIRECIONAMENTOS or not destino:
+                break
+            destino = urljoin(url, destino)
+            if urlsplit(destino).scheme not in ("http", "https"):
+                raise HTTPError(url, status,
+                                f"Redirecionamento para {destino} nao permitido",
+                                cabecalhos_da_resposta, io.BytesIO(corpo))
+            url = destino
+        else:
+            raise HTTPError(url, status, f"Redirecionamentos demais: {motivo}",
+                            cabecalhos_da_resposta, io.BytesIO(corpo))
+        if not 200 <= status < 300:
+            raise HTTPError(url, status, motivo, cabecalhos_da_resposta,
+                            io.BytesIO(corpo))
+        return RespostaDoPool(url, status, motivo, cabecalhos_da_resposta, corpo)
+
+    def _requisitar(self, url, cabecalhos, timeout):
+        """Retorna (status, motivo, cabecalhos, corpo) de um GET em `url`."""
+        partes = urlsplit(url)
+        chave = (partes.scheme, partes.hostname, partes.port)
+        caminho = partes.path or "/"
+        if partes.query:
+            caminho += "?" + partes.query
+        conexao, reaproveitada = self._adquirir(chave)
+        try:
+            try:
+                try:
+                    resposta = self._enviar(conexao, caminho, cabecalhos, timeout)
+                except ERROS_DE_CONEXAO_QUEBRADA:
+                    if not reaproveitada:
+                        raise
+                    conexao.close()
+                    conexao = self._conectar(chave)
+                    resposta = self._enviar(conexao, caminho, cabecalhos, timeout)
+            except OSError as e:
+                raise URLError(e) from e
+            corpo = resposta.read()
+        except BaseException:
+            self._liberar(chave, conexao, reutilizar=False)
+            raise
+        self._liberar(chave, conexao, reutilizar=not resposta.will_close)
+        return resposta.status, resposta.reason, resposta.headers, corpo
+
+    def fechar(self):
+        with self._condicao:
+            for chave, livres in self._livres.items():
+                for conexao, _ in livres:
+                    conexao.close()
+                    self._abertas[chave] -= 1
+            self._livres.clear()
+            self._condicao.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, param1, param2, param3):
+        self.fechar()
+
+    @property
+    def conexoes_abertas(self):
+        with self._condicao:
+            return sum(self._abertas.values())
+
+    def _enviar(self, conexao, caminho, cabecalhos, timeout):
+        conexao.timeout = timeout
+        if getattr(conexao, "sock", None) is not None:
+            conexao.sock.settimeout(timeout)
+        conexao.request("GET", caminho, headers=cabecalhos)
+        return conexao.getresponse()
+
+    def _conectar(self, chave):
+        esquema, host, porta = chave
+        classe = HTTPSConnection if esquema == "https" else HTTPConnection
+        return classe(host, porta, timeout=self._timeout)
+
+    def _adquirir(self, chave):
+        with self._condicao:
+            while True:
+                self._descartar_ociosas()
+                livres = self._livres.get(chave)
+                if livres:
+                    conexao, _ = livres.pop()
+                    return conexao, True
+                if self._abertas.get(chave, 0) < self._maximo_por_host:
+                    self._abertas[chave] = self._abertas.get(chave, 0) + 1
+                    break
+                self._condicao.wait()
+        try:
+            return self._conectar(chave), False
+        except BaseException:
+            self._liberar(chave, None, reutilizar=False)
+            raise
+
+    def _liberar(self, chave, conexao, reutilizar):
+        with self._condicao:
+            if reutilizar:
+                self._livres.setdefault(chave, []).append(
+                    (conexao, time.monotonic())
+                )
+            else:
+                if conexao is not None:
+                    conexao.close()
+                self._abertas[chave] -= 1
+            self._condicao.notify()
+
+    def _descartar_ociosas(self):
+        limite = time.monotonic() - self._ociosidade_maxima
+        for chave, livres in self._livres.items():
+            while livres and livres[0][1] < limite:
+                conexao, _ = livres.pop(0)
+                conexao.close()
+                self._abertas[chave] -= 1
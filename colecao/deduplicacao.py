@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+from hashlib import blake2b
+import json
+import math
+import os
+import struct
+
+
+def impressao_digital(documento):
+    """
+    Hash estavel do documento (16 bytes): o JSON com chaves ordenadas, entao
+    a ordem das chaves e a origem da pagina nao importam.
+    """
+    if hasattr(documento, "para_dict"):
+        documento = documento.para_dict()
+    texto = json.dumps(documento, sort_keys=True, ensure_ascii=False,
+                       separators=(",", ":"))
+    return blake2b(texto.encode(), digest_size=16).digest()
+
+
+class Deduplicador(ABC):
+    """
+    Descarta documentos ja vistos. As subclasses definem como as impressoes
+    digitais sao lembradas; `descartados` conta os documentos repetidos.
+    """
+
+    def __init__(self):
+        self.descartados = 0
+
+    def novo(self, documento):
+        """Indica se `documento` ainda nao foi visto, e passa a lembrar dele."""
+        if self._lembrar(impressao_digital(documento)):
+            return True
+        self.descartados += 1
+        return False
+
+    def filtrar(self, documentos, em_fluxo=False):
+        """Documentos ainda nao vistos; com em_fluxo=True, um iterador."""
+        novos = (documento for documento in documentos if self.novo(documento))
+        return novos if em_fluxo else list(novos)
+
+    @abstractmethod
+    def _lembrar(self, impressao):
+        """Lembra `impressao`; False se ela ja tinha sido vista."""
+
+    def salvar(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, param1, param2, param3):
+        self.salvar()
+
+
+class ConjuntoDeImpressoes(Deduplicador):
+    """Deduplicacao exata, com um set das impressoes em memoria."""
+
+    def __init__(self):
+        super().__init__()
+        self._vistas = set()
+
+    def _lembrar(self, impressao):
+        if impressao in self._vistas:
+            return False
+        self._vistas.add(impressao)
+        return True
+
+    def __len__(self):
+        return len(self._vistas)
+
+
+class FiltroDeBloom(Deduplicador):
+    """
+    Deduplicacao com memoria limitada: um filtro de Bloom dimensionado para
+    `capacidade` documentos com `taxa_de_falsos_positivos`. Um falso
+    positivo descarta um documento novo; repetidos nunca passam.
+    Com `caminho`, o filtro e carregado de la, se existir, e salvar() o
+    grava para a proxima execucao.
+    """
+
+    _CABECALHO = struct.Struct(">6sQQQ")
+    _MAGICO = b"BLOOM1"
+
+    def __init__(self, capacidade=10_000_000, taxa_de_falsos_positivos=0.001,
+                 caminho=None):
+        super().__init__()
+        self._caminho = caminho
+        if caminho and os.path.exists(caminho):
+            self._carregar(caminho)
+            return
+        bits = math.ceil(
+            -capacidade * math.log(taxa_de_falsos_positivos) / math.log(2) ** 2
+        )
+        self._bits = bits
+        self._funcoes = max(1, round(bits / capacidade * math.log(2)))
+        self._mapa = bytearray((bits + 7) // 8)
+        self.inseridos = 0
+
+    def _lembrar(self, impressao):
+        h1 = int.from_bytes(impressao[:8], "big")
+        h2 = int.from_bytes(impressao[8:], "big") | 1
+        mapa = self._mapa
+        novo = False
+        for i in range(self._funcoes):
+            posicao = (h1 + i * h2) % self._bits
+            byte, bit = divmod(posicao, 8)
+            if not mapa[byte] & (1 << bit):
+                mapa[byte] |= 1 << bit
+                novo = True
+        if novo:
+            self.inseridos += 1
+        return novo
+
+    def salvar(self):
+        if not self._caminho:
+            return
+        temporario = self._caminho + ".tmp"
+        with open(temporario, "wb") as fp:
+            fp.write(self._CABECALHO.pack(
+                self._MAGICO, self._bits, self._funcoes, self.inseridos
+            ))
+            fp.write(self._mapa)
+        os.replace(temporario, self._caminho)
+
+    def _carregar(self, caminho):
+        with open(caminho, "rb") as fp:
+            magico, self._bits, self._funcoes, self.inseridos = (
+                self._CABECALHO.unpack(fp.read(self._CABECALHO.size))
+            )
+            if magico != self._MAGICO:
+                raise ValueError(f"Arquivo {caminho} nao e um filtro de Bloom.")
+            self._mapa = bytearray(fp.read())
+        if len(self._mapa) != (self._bits + 7) // 8:
+            raise ValueError(f"Filtro de Bloom {caminho} truncado.")
+
+    def __len__(self):
+        return self.inseridos
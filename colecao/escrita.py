@@ -0,0 +1,122 @@
+import logging
+import os
+import queue
+import threading
+
+from colecao.livros import gravar_conteudo, compressao_do_arquivo
+from colecao.metricas import instrumentar, tamanho_em_bytes
+
+
+class EscritorDeArquivos:
+    """
+    Grava arquivos em segundo plano (write-behind):
+        - uma thread consome uma fila de no maximo `tamanho_da_fila` arquivos
+        - diretorios ja criados sao lembrados e nao sao criados de novo
+        - cada arquivo e gravado num temporario e renomeado (os.replace)
+        - fsync: "nunca", "sempre" (cada arquivo) ou "esvaziar" (os arquivos
+          gravados desde o ultimo esvaziar, ao esvaziar ou fechar); o
+          diretorio tambem e sincronizado, para que a renomeacao sobreviva
+          a uma queda
+        - compressao: como em escrever_em_arquivo
+    """
+
+    politicas_de_fsync = ("nunca", "sempre", "esvaziar")
+
+    def __init__(self, tamanho_da_fila=64, fsync="nunca", compressao=None):
+        if fsync not in self.politicas_de_fsync:
+            raise ValueError(f"Politica de fsync invalida: {fsync}")
+        compressao_do_arquivo("", compressao)
+        self._fsync = fsync
+        self._compressao = compressao
+        self._fila = queue.Queue(maxsize=tamanho_da_fila)
+        self._diretorios = set()
+        self._pendentes_de_fsync = []
+        self._fechado = False
+        self.gravados = 0
+        self.erros = 0
+        self._thread = threading.Thread(
+            target=self._executar, name="EscritorDeArquivos", daemon=True
+        )
+        self._thread.start()
+
+    def escrever(self, arquivo, conteudo):
+        """Enfileira a gravacao; bloqueia enquanto a fila estiver cheia."""
+        if self._fechado:
+            raise ValueError("EscritorDeArquivos ja foi fechado.")
+        self._fila.put((arquivo, conteudo))
+
+    def esvaziar(self):
+        """Aguarda a gravacao de tudo que foi enfileirado ate agora."""
+        self._fila.join()
+        if self._fsync == "esvaziar":
+            pendentes, self._pendentes_de_fsync = self._pendentes_de_fsync, []
+            for arquivo in pendentes:
+                self._sincronizar(arquivo)
+            for diretorio in dict.fromkeys(map(os.path.dirname, pendentes)):
+                self._sincronizar(diretorio or os.curdir)
+
+    def fechar(self):
+        if self._fechado:
+            return
+        self.esvaziar()
+        self._fechado = True
+        self._fila.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, param1, param2, param3):
+        self.fechar()
+
+    def _executar(self):
+        while True:
+            item = self._fila.get()
+            try:
+                if item is None:
+                    return
+                self._gravar(*item)
+            except Exception as e:
+                # Um item com erro nao pode encerrar a thread: esvaziar e
+                # fechar ficariam esperando os itens seguintes para sempre.
+                self.erros += 1
+                logging.exception(f"Nao foi possivel criar arquivo {item[0]}.")
+            finally:
+                self._fila.task_done()
+
+    @instrumentar(
+        "escrita",
+        lambda resultado, escritor, arquivo, conteudo:
+            {"bytes": tamanho_em_bytes(conteudo)},
+    )
+    def _gravar(self, arquivo, conteudo):
+        diretorio = os.path.dirname(arquivo)
+        temporario = f"{arquivo}.tmp"
+        try:
+            if diretorio and diretorio not in self._diretorios:
+                os.makedirs(diretorio, exist_ok=True)
+                self._diretorios.add(diretorio)
+            compressao = compressao_do_arquivo(arquivo, self._compressao)
+            gravar_conteudo(temporario, conteudo, compressao)
+            if self._fsync == "sempre":
+                self._sincronizar(temporario)
+            os.replace(temporario, arquivo)
+            if self._fsync == "sempre":
+                self._sincronizar(diretorio or os.curdir)
+        except OSError as e:
+            self.erros += 1
+            logging.exception(f"Nao foi possivel criar arquivo {arquivo}.")
+            return
+        self.gravados += 1
+        if self._fsync == "esvaziar":
+            self._pendentes_de_fsync.append(arquivo)
+
+    def _sincronizar(self, arquivo):
+        try:
+            fd = os.open(arquivo, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
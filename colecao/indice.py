@@ -0,0 +1,122 @@
+import json
+import re
+import sqlite3
+import unicodedata
+
+from colecao.deduplicacao import impressao_digital
+
+
+_palavras = re.compile(r"\w+")
+
+# Campos dos documentos indexados e o nome usado nas consultas.
+CAMPOS = {"autor": "author", "titulo": "title"}
+
+
+def normalizar_termos(texto):
+    """
+    Termos de `texto` sem acentos e em minusculas. Listas (varios autores)
+    contribuem com os termos de cada item.
+    """
+    if isinstance(texto, (list, tuple)):
+        return [termo for item in texto for termo in normalizar_termos(item)]
+    if not isinstance(texto, str):
+        return []
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _palavras.findall(sem_acentos.casefold())
+
+
+class IndiceDeLivros:
+    """
+    Indice invertido em disco (SQLite) dos documentos baixados:
+        - documentos: cada documento uma vez, como JSON
+        - termos: (campo, termo) -> documento, para autor e titulo
+    inserir_registros tem a mesma assinatura esperada por registrar_livros,
+    entao o indice e atualizado a cada pagina registrada.
+    """
+
+    def __init__(self, caminho):
+        self._conexao = sqlite3.connect(caminho)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        with self._conexao:
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS documentos ("
+                " id INTEGER PRIMARY KEY,"
+                " impressao TEXT UNIQUE NOT NULL,"
+                " documento TEXT NOT NULL)"
+            )
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS termos ("
+                " campo TEXT NOT NULL,"
+                " termo TEXT NOT NULL,"
+                " documento INTEGER NOT NULL,"
+                " PRIMARY KEY (campo, termo, documento)) WITHOUT ROWID"
+            )
+
+    def inserir_registros(self, documentos):
+        """Indexa `documentos` e retorna quantos ainda nao estavam no indice."""
+        inseridos = 0
+        with self._conexao:
+            for documento in documentos:
+                if hasattr(documento, "para_dict"):
+                    documento = documento.para_dict()
+                texto = json.dumps(documento, sort_keys=True, ensure_ascii=False)
+                cursor = self._conexao.execute(
+                    "INSERT OR IGNORE INTO documentos (impressao, documento)"
+                    " VALUES (?, ?)",
+                    (impressao_digital(documento).hex(), texto),
+                )
+                if not cursor.rowcount:
+                    continue
+                inseridos += 1
+                self._conexao.executemany(
+                    "INSERT OR IGNORE INTO termos VALUES (?, ?, ?)",
+                    [
+                        (campo, termo, cursor.lastrowid)
+                        for campo, chave in CAMPOS.items()
+                        for termo in normalizar_termos(documento.get(chave))
+                    ],
+                )
+        return inseridos
+
+    def buscar(self, autor=None, titulo=None, limite=None):
+        """
+        Documentos cujo autor e titulo contem todos os termos de `autor` e
+        `titulo`, na ordem em que foram indexados.
+        """
+        condicoes = [
+            (campo, termo)
+            for campo, texto in (("autor", autor), ("titulo", titulo))
+            for termo in normalizar_termos(texto)
+        ]
+        if not condicoes:
+            return []
+        subconsulta = " INTERSECT ".join(
+            ["SELECT documento FROM termos WHERE campo = ? AND termo = ?"]
+            * len(condicoes)
+        )
+        sql = (
+            "SELECT documento FROM documentos"
+            f" WHERE id IN ({subconsulta}) ORDER BY id"
+        )
+        parametros = [valor for condicao in condicoes for valor in condicao]
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        return [
+            json.loads(texto)
+            for texto, in self._conexao.execute(sql, parametros)
+        ]
+
+    def __len__(self):
+        return self._conexao.execute("SELECT count(*) FROM documentos").fetchone()[0]
+
+    def fechar(self):
+        self._conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, param1, param2, param3):
+        self.fechar()
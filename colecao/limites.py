@@ -0,0 +1,78 @@
+from urllib.parse import urlsplit
+from urllib.request import Request
+import asyncio
+import threading
+import time
+
+
+class LimitadorDeTaxa:
+    """
+    Token bucket por host, compartilhado entre threads e corrotinas:
+        - cada host recebe `taxa` fichas por segundo, acumulando ate `rajada`
+        - `por_host` ({host: (taxa, rajada)}) define limites proprios
+        - cada requisicao reserva uma ficha e espera o tempo que faltar
+    O tempo total de espera fica em `estatisticas`.
+    """
+
+    def __init__(self, taxa, rajada=1, por_host=None):
+        self._taxa = taxa
+        self._rajada = rajada
+        self._por_host = por_host or {}
+        self._baldes = {}
+        self._trava = threading.Lock()
+        self.requisicoes = 0
+        self.esperas = 0
+        self.tempo_esperado = 0.0
+
+    def aguardar(self, url):
+        """Bloqueia ate haver ficha para o host de `url`; retorna a espera."""
+        espera = self._reservar(url)
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+    async def aguardar_async(self, url):
+        """Como aguardar, sem bloquear o loop de eventos."""
+        espera = self._reservar(url)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        return espera
+
+    @property
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "requisicoes": self.requisicoes,
+                "esperas": self.esperas,
+                "tempo_esperado": self.tempo_esperado,
+            }
+
+    def _reservar(self, url):
+        if isinstance(url, Request):
+            url = url.full_url
+        host = urlsplit(url).hostname
+        taxa, rajada = self._por_host.get(host, (self._taxa, self._rajada))
+        agora = time.monotonic()
+        with self._trava:
+            fichas, atualizado_em = self._baldes.get(host, (rajada, agora))
+            fichas = min(rajada, fichas + (agora - atualizado_em) * taxa) - 1
+            self._baldes[host] = (fichas, agora)
+            espera = max(0.0, -fichas / taxa)
+            self.requisicoes += 1
+            if espera:
+                self.esperas += 1
+                self.tempo_esperado += espera
+        return espera
+
+
+_limitador_global = None
+
+
+def definir_limitador_global(limitador):
+    """Define o limitador usado por todas as requisicoes deste processo."""
+    global _limitador_global
+    _limitador_global = limitador
+
+
+def limitador_global():
+    return _limitador_global
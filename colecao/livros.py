@@ -1,15 +1,41 @@
 from urllib.request import urlopen, Request
 from urllib.parse import urlencode
 from urllib.error import HTTPError
+from http.client import HTTPException
 from math import ceil
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import deque
+import gzip
 import logging
+import lzma
+import mmap
 import os
 import json
+import re
+import sys
+import time
+import zlib
 
-def consultar_livros(autor):
+from colecao.limites import limitador_global
+from colecao.metricas import instrumentar, metricas_globais, tamanho_em_bytes
+from colecao.perfil import iniciar_thread, perfilavel
+from colecao.resiliencia import indica_sobrecarga
+
+
+# Endereco da consulta por autor; pode ser trocado para usar outro servidor.
+ENDERECO_DO_BUSCADOR = "https://buscador"
+
+
+def consultar_livros(autor, memoria=None, **opcoes):
+    """
+    Com uma `memoria` (colecao.cache.CacheEmMemoria), consultas repetidas
+    ou simultaneas pelo mesmo autor reaproveitam um unico resultado.
+    """
+    if memoria:
+        return memoria.obter(autor, lambda: consultar_livros(autor, **opcoes))
     dados = preparar_dados_para_requisicao(autor)
-    url = obter_url("https://buscador", dados)
-    ret = executar_requisicao(url)
+    url = obter_url(ENDERECO_DO_BUSCADOR, dados)
+    ret = executar_requisicao(url, **opcoes)
     return ret
 
 
@@ -19,32 +45,237 @@ def preparar_dados_para_requisicao(autor):
 
 
 def obter_url(url, dados):
-    pass
+    return url + "?" + urlencode(dados)
 
 
-def executar_requisicao(url):
-    try:
-        with urlopen(url, timeout=10) as resposta:
-            resultado = resposta.read().decode()
-    except HTTPError as e:
-        logging.exception(f"Ao acessar {url}: {e}")
-    else:
+def _contar_requisicao(resultado, *args, **kwargs):
+    if resultado is None:
+        return {"erro": True}
+    return {"bytes": tamanho_em_bytes(resultado)}
+
+
+@instrumentar("requisicao", _contar_requisicao)
+def executar_requisicao(url, pool=None, cache=None, politica=None,
+                        controle=None, limitador=None, validadores=None,
+                        aceitar_compressao=True, manter_comprimido=False):
+    """
+    Retorna o conteudo de `url` ou None em caso de HTTPError.
+
+    Com um `pool` (colecao.conexoes.PoolDeConexoes), a requisicao reaproveita
+    uma conexao persistente em vez de abrir uma nova com urlopen.
+    Com um `cache` (colecao.cache.CacheEmDisco), o conteudo ja guardado para
+    `url` e retornado sem acessar a rede.
+    Com uma `politica` (colecao.resiliencia.PoliticaDeRetentativa), erros
+    temporarios sao repetidos apos uma espera; esgotadas as tentativas, o
+    erro e registrado e o retorno e None, inclusive para URLError. Com ela,
+    falhas durante a leitura da resposta (timeout, conexao reiniciada,
+    IncompleteRead) tambem sao repetidas.
+    Com um `controle` (colecao.resiliencia.ControleDeConcorrencia), a
+    requisicao aguarda uma vaga e informa sucessos e sobrecargas (429/503).
+    Cada tentativa aguarda o `limitador` (colecao.limites.LimitadorDeTaxa)
+    ou, sem ele, o limitador global do processo, se houver.
+    Com `validadores` (colecao.validadores.RepositorioDeValidadores), a
+    requisicao envia If-None-Match/If-Modified-Since; num 304 o conteudo
+    guardado e retornado como Conteudo com nao_modificado=True.
+    A resposta e decodificada com o charset informado pelo servidor e, se
+    vier com gzip ou deflate, descomprimida aos poucos. Por padrao a
+    requisicao envia Accept-Encoding pedindo esses formatos;
+    aceitar_compressao=False desliga o cabecalho. Com manter_comprimido, uma
+    resposta gzip e retornada como Conteudo com os bytes originais em
+    `gzip`, que escrever_em_arquivo grava direto em arquivos gzip.
+    """
+    if cache:
+        resultado = cache.obter(url)
+        if resultado is not None:
+            return resultado
+    abrir = pool.abrir if pool else urlopen
+    limitador = limitador or limitador_global()
+    cabecalhos = {}
+    if aceitar_compressao:
+        cabecalhos["Accept-Encoding"] = "gzip, deflate"
+    if validadores:
+        cabecalhos.update(validadores.cabecalhos(url))
+    pedido = url
+    if cabecalhos and isinstance(url, str):
+        pedido = Request(url, headers=cabecalhos)
+    tentativa = 0
+    while True:
+        if limitador:
+            limitador.aguardar(url)
+        try:
+            if controle:
+                with controle:
+                    resultado, cabecalhos = ler_resposta(
+                        abrir, pedido, manter_comprimido
+                    )
+            else:
+                resultado, cabecalhos = ler_resposta(
+                    abrir, pedido, manter_comprimido
+                )
+        except (OSError, HTTPException) as e:
+            guardado = None
+            if validadores and getattr(e, "code", None) == 304:
+                guardado = validadores.conteudo(url)
+            if guardado is not None:
+                resultado = Conteudo(guardado)
+                resultado.nao_modificado = True
+                return resultado
+            if controle and indica_sobrecarga(e):
+                controle.sobrecarga()
+            if politica and politica.deve_repetir(e, tentativa):
+                time.sleep(politica.espera(tentativa, e))
+                tentativa += 1
+                continue
+            if not politica and not isinstance(e, HTTPError):
+                raise
+            logging.exception(f"Ao acessar {url}: {e}")
+            return None
+        except zlib.error as e:
+            logging.exception(f"Resposta comprimida invalida em {url}: {e}")
+            return None
+        if controle:
+            controle.sucesso()
+        if cache:
+            cache.guardar(url, resultado)
+        if validadores:
+            validadores.guardar(url, cabecalhos, resultado)
         return resultado
 
 
-def escrever_em_arquivo(arquivo, conteudo):
+# Tamanho dos blocos lidos de respostas comprimidas.
+TAMANHO_DO_BLOCO = 64 * 1024
+
+
+def ler_resposta(abrir, pedido, manter_comprimido=False):
+    """Retorna (texto, cabecalhos) da resposta a `pedido`."""
+    with abrir(pedido, timeout=10) as resposta:
+        cabecalhos = getattr(resposta, "headers", None)
+        codificacao = ""
+        charset = None
+        if cabecalhos is not None:
+            codificacao = cabecalhos.get("Content-Encoding", "").lower()
+            charset = cabecalhos.get_content_charset()
+        if codificacao not in ("gzip", "deflate"):
+            return resposta.read().decode(charset or "utf-8"), cabecalhos
+        blocos_comprimidos = [] if manter_comprimido else None
+        corpo = descomprimir(resposta, codificacao, blocos_comprimidos)
+    texto = Conteudo(corpo.decode(charset or "utf-8"))
+    if manter_comprimido and codificacao == "gzip":
+        texto.gzip = b"".join(blocos_comprimidos)
+    return texto, cabecalhos
+
+
+def descomprimir(resposta, codificacao, blocos_comprimidos=None):
+    """
+    Le e descomprime `resposta` em blocos de TAMANHO_DO_BLOCO. "deflate"
+    aceita tanto o formato zlib quanto o deflate puro enviado por alguns
+    servidores.
+    """
+    if codificacao == "gzip":
+        descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    else:
+        descompressor = zlib.decompressobj(zlib.MAX_WBITS)
+    partes = []
+    primeiro = True
+    while True:
+        bloco = resposta.read(TAMANHO_DO_BLOCO)
+        if not bloco:
+            break
+        if blocos_comprimidos is not None:
+            blocos_comprimidos.append(bloco)
+        try:
+            partes.append(descompressor.decompress(bloco))
+        except zlib.error:
+            if not (primeiro and codificacao == "deflate"):
+                raise
+            descompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            partes.append(descompressor.decompress(bloco))
+        primeiro = False
+    partes.append(descompressor.flush())
+    return b"".join(partes)
+
+
+class Conteudo(str):
+    """Texto da resposta, com informacoes sobre como foi obtido."""
+
+    # True quando o servidor respondeu 304 e o texto veio dos validadores.
+    nao_modificado = False
+    # Corpo gzip original, quando a resposta foi mantida comprimida.
+    gzip = None
+
+
+@instrumentar(
+    "escrita",
+    lambda resultado, arquivo, conteudo, *args, **kwargs:
+        {"bytes": tamanho_em_bytes(conteudo)},
+)
+def escrever_em_arquivo(arquivo, conteudo, compressao=None):
+    """
+    Grava `conteudo` em `arquivo`, comprimido com `compressao` ("gzip" ou
+    "lzma") ou conforme a extensao (ver COMPRESSAO_POR_EXTENSAO).
+    """
     diretorio = os.path.dirname(arquivo)
     try:
         os.makedirs(diretorio)
+    except FileExistsError:
+        pass
     except OSError as e:
         logging.exception(f"Nao foi possivel criar o diretorio {diretorio}.")
     try:
-        with open(arquivo, "w") as fp:
-            fp.write(conteudo)
+        gravar_conteudo(arquivo, conteudo, compressao)
     except OSError as e:
         logging.exception(f"Nao foi possivel criar arquivo {arquivo}.")
 
 
+def gravar_conteudo(arquivo, conteudo, compressao=None):
+    """
+    Grava `conteudo` em `arquivo`. Num arquivo gzip, um Conteudo que trouxe
+    o corpo gzip da resposta e gravado sem ser comprimido de novo.
+    """
+    compressao = compressao_do_arquivo(arquivo, compressao)
+    comprimido = getattr(conteudo, "gzip", None)
+    if compressao == "gzip" and comprimido:
+        with open(arquivo, "wb") as fp:
+            fp.write(comprimido)
+        return
+    with abrir_para_escrita(arquivo, compressao) as fp:
+        fp.write(conteudo)
+
+
+COMPRESSOES = {"gzip": gzip, "lzma": lzma}
+COMPRESSAO_POR_EXTENSAO = {".gz": "gzip", ".xz": "lzma", ".lzma": "lzma"}
+# Bytes iniciais de cada formato: gzip, xz e lzma "alone".
+ASSINATURAS_DE_COMPRESSAO = {
+    b"\x1f\x8b": "gzip",
+    b"\xfd7zXZ\x00": "lzma",
+    b"\x5d\x00\x00": "lzma",
+}
+
+
+def compressao_do_arquivo(arquivo, compressao=None):
+    if compressao:
+        if compressao not in COMPRESSOES:
+            raise ValueError(f"Compressao invalida: {compressao}")
+        return compressao
+    return COMPRESSAO_POR_EXTENSAO.get(os.path.splitext(arquivo)[1])
+
+
+def abrir_para_escrita(arquivo, compressao=None):
+    """Abre `arquivo` para escrita de texto, comprimido se for o caso."""
+    compressao = compressao_do_arquivo(arquivo, compressao)
+    if compressao:
+        return COMPRESSOES[compressao].open(arquivo, "wt", encoding="utf-8")
+    return open(arquivo, "w")
+
+
+def detectar_compressao(inicio):
+    """Compressao indicada pelos primeiros bytes de um arquivo, ou None."""
+    for assinatura, compressao in ASSINATURAS_DE_COMPRESSAO.items():
+        if inicio.startswith(assinatura):
+            return compressao
+    return None
+
+
 class Consulta:
     """
     Armazena os dados da expressao de busca:
@@ -54,13 +285,15 @@ class Consulta:
         - dados_para_requisicao
     """
 
+    endereco = "https://buscarlivros"
+
     def __init__(self, autor: str, titulo: str, livre: str) -> None:
         self._autor: str = autor
         self._titulo: str = titulo
         self._livre: str = livre
         self._pagina: int = 0
         self._dados_para_requisicao: dict = None
-        self._url = "https://buscarlivros"
+        self._url = self.endereco
 
 
     @property
@@ -82,16 +315,160 @@ class Consulta:
         return self._dados_para_requisicao
 
 
+    @property
+    def chave(self)->str:
+        """Identifica a consulta, independente da pagina."""
+        dados = {
+            nome: valor for nome, valor in self.dados_para_requisicao.items()
+            if nome != "page"
+        }
+        return urlencode(sorted(dados.items()))
+
+
     @property
     def seguinte(self):
-        dados_para_requisicao = self.dados_para_requisicao
         self._pagina += 1
-        dados_para_requisicao["page"] = self._pagina
+        return self.url_da_pagina(self._pagina)
+
+
+    def url_da_pagina(self, pagina):
+        dados_para_requisicao = self.dados_para_requisicao
+        dados_para_requisicao["page"] = pagina
         req = Request(self._url, dados_para_requisicao)
         if req.data:
             return req.full_url + "?" + urlencode(req.data)
 
 
+_AUSENTE = object()
+
+
+def _hashable(valor):
+    """`valor` do JSON com listas como tuplas e objetos como frozensets."""
+    if isinstance(valor, list):
+        return tuple(_hashable(item) for item in valor)
+    if isinstance(valor, dict):
+        return frozenset((chave, _hashable(item)) for chave, item in valor.items())
+    return valor
+
+
+class Livro:
+    """
+    Documento da pagina com __slots__, mais leve que um dicionario.
+
+    Os nomes de autor sao internados (sys.intern), entao autores repetidos
+    em varias paginas compartilham a mesma string. Chaves alem de author e
+    title ficam em `outros`.
+    """
+
+    __slots__ = ("author", "title", "outros")
+
+    def __init__(self, author=_AUSENTE, title=_AUSENTE, outros=None):
+        self.author = sys.intern(author) if isinstance(author, str) else author
+        self.title = title
+        self.outros = outros
+
+    @classmethod
+    def de_documento(cls, documento):
+        outros = None
+        if len(documento) > 2 or not documento.keys() <= {"author", "title"}:
+            outros = {
+                chave: valor for chave, valor in documento.items()
+                if chave not in ("author", "title")
+            }
+        return cls(
+            documento.get("author", _AUSENTE),
+            documento.get("title", _AUSENTE),
+            outros,
+        )
+
+    def para_dict(self):
+        """Dicionario igual ao documento original."""
+        documento = {}
+        if self.author is not _AUSENTE:
+            documento["author"] = self.author
+        if self.title is not _AUSENTE:
+            documento["title"] = self.title
+        if self.outros:
+            documento.update(self.outros)
+        return documento
+
+    def __eq__(self, outro):
+        if isinstance(outro, Livro):
+            return self.para_dict() == outro.para_dict()
+        return NotImplemented
+
+    def __hash__(self):
+        # Livros iguais tem author e title iguais; `outros` fica de fora.
+        return hash((_hashable(self.author), _hashable(self.title)))
+
+    def __repr__(self):
+        return f"Livro({self.para_dict()!r})"
+
+
+_decodificador_json = json.JSONDecoder()
+_espacos_json = re.compile(r"[ \t\n\r]*")
+
+
+def varrer_objeto_json(texto, lista):
+    """
+    Percorre o objeto JSON de `texto` sem decodifica-lo inteiro.
+
+    Gera (chave, valor) para cada chave do objeto; os itens do array em
+    `lista` sao gerados um a um, como (lista, item). Levanta TypeError se o
+    valor de `lista` nao for um array.
+    """
+    def pular(pos):
+        return _espacos_json.match(texto, pos).end()
+
+    def esperar(pos, *permitidos):
+        pos = pular(pos)
+        if texto[pos:pos + 1] not in permitidos:
+            raise json.JSONDecodeError(
+                f"Esperado um de {permitidos}", texto, pos
+            )
+        return texto[pos], pos + 1
+
+    _, pos = esperar(0, "{")
+    pos = pular(pos)
+    if texto[pos:pos + 1] == "}":
+        return
+    while True:
+        chave, pos = _decodificador_json.raw_decode(texto, pos)
+        if not isinstance(chave, str):
+            raise json.JSONDecodeError("Esperado nome de chave", texto, pos)
+        _, pos = esperar(pos, ":")
+        pos = pular(pos)
+        if chave == lista:
+            if texto[pos:pos + 1] != "[":
+                raise TypeError(f'"{lista}" nao e um array.')
+            pos = pular(pos + 1)
+            if texto[pos:pos + 1] == "]":
+                pos += 1
+            else:
+                while True:
+                    item, pos = _decodificador_json.raw_decode(texto, pos)
+                    yield chave, item
+                    separador, pos = esperar(pos, ",", "]")
+                    if separador == "]":
+                        break
+                    pos = pular(pos)
+        else:
+            valor, pos = _decodificador_json.raw_decode(texto, pos)
+            yield chave, valor
+        separador, pos = esperar(pos, ",", "}")
+        if separador == "}":
+            return
+        pos = pular(pos)
+
+
+@instrumentar(
+    "decodificacao",
+    lambda resultado, conteudo: {"bytes": tamanho_em_bytes(conteudo)},
+)
+def decodificar_json(conteudo):
+    return json.loads(conteudo)
+
+
 class Resposta:
     """Conteudo da pagina em formato JSON."""
 
@@ -102,6 +479,8 @@ class Resposta:
         self._conteudo = conteudo
         # Conteudo processado, formato dicionario
         self._dados = None
+        # num_docs lido por iter_documentos
+        self._num_docs = None
 
     @property
     def conteudo(self):
@@ -111,7 +490,7 @@ class Resposta:
     def dados(self):
         if not self._dados:
             try:
-                j = json.loads(self.conteudo)
+                j = decodificar_json(self.conteudo)
             except TypeError as e:
                 logging.exception(
                     "Resultado da consulta {self.conteudo}: tipo invalido. "
@@ -128,9 +507,56 @@ class Resposta:
     @property
     def documentos(self):
         """Documentos retornados na pagina."""
+        if not self.dados:
+            return []
         return self.dados.get("docs", [])
 
 
+    def iter_documentos(self):
+        """
+        Documentos da pagina, decodificados um a um.
+
+        Nao monta o dicionario da pagina inteira: cada item de "docs" e
+        decodificado quando pedido e "num_docs" fica em quantidade_de_documentos.
+        """
+        if self._dados:
+            yield from self.documentos
+            return
+        try:
+            for chave, valor in varrer_objeto_json(self.conteudo, "docs"):
+                if chave == "docs":
+                    yield valor
+                elif chave == "num_docs":
+                    self._num_docs = valor
+        except TypeError as e:
+            logging.exception("Resultado da consulta: tipo invalido.")
+        except json.JSONDecodeError as e:
+            logging.exception("Resultado da consulta: JSON invalido.")
+
+
+    def iter_livros(self):
+        """Documentos da pagina como Livro, decodificados um a um."""
+        for documento in self.iter_documentos():
+            yield Livro.de_documento(documento)
+
+
+    @property
+    def livros(self):
+        """Documentos da pagina como Livro."""
+        return [Livro.de_documento(documento) for documento in self.documentos]
+
+
+    @property
+    def quantidade_de_documentos(self):
+        """Valor de num_docs, sem guardar os documentos da pagina."""
+        if self._dados:
+            return self._dados.get("num_docs", 0)
+        if self._num_docs is None:
+            for _ in self.iter_documentos():
+                pass
+        return self._num_docs or 0
+
+
     @property
     def total_de_paginas(self):
         """Total de paginas, todos os resultados."""
@@ -142,33 +568,263 @@ class Resposta:
         return 0
 
 
-def baixar_livros(arquivo, autor, titulo, livre):
+@perfilavel("baixar_livros")
+def baixar_livros(arquivo, autor, titulo, livre, trabalhadores=1,
+                  escritor=None, armazem=None, manifesto=None, **opcoes):
+    """
+    Baixa as paginas da consulta, gravando a pagina i em arquivo[i].
+
+    Com trabalhadores > 1, as paginas restantes sao baixadas em paralelo
+    assim que a primeira resposta valida informa o total de paginas.
+    Com um `escritor` (colecao.escrita.EscritorDeArquivos), as paginas sao
+    gravadas em segundo plano; o escritor e esvaziado antes do retorno.
+    Com um `armazem` (colecao.segmentos.ArmazemDeSegmentos), as paginas sao
+    acrescentadas nele com a chave da consulta e `arquivo` nao e usado.
+    Paginas nao modificadas (Conteudo.nao_modificado) so nao sao regravadas
+    se o destino ja tiver o mesmo conteudo.
+    Com um `manifesto` (colecao.manifesto.Manifesto), cada pagina gravada e
+    registrada; se o total de paginas ja for conhecido, so sao baixadas as
+    paginas que faltam ou cujo conteudo gravado nao confere.
+    As `opcoes` sao repassadas para executar_requisicao.
+    Com `perfil` (colecao.perfil.Perfil ou True), ou COLECAO_PERFIL no
+    ambiente, a execucao e perfilada com cProfile e/ou tracemalloc.
+    """
     consulta = Consulta(autor, titulo, livre)
+    if armazem is not None:
+        def gravar(indice, conteudo):
+            armazem.gravar(consulta.chave, indice + 1, conteudo)
+
+        def ler_gravado(indice):
+            return armazem.ler(consulta.chave, indice + 1)
+    else:
+        escrever = escritor.escrever if escritor else escrever_em_arquivo
+
+        def gravar(indice, conteudo):
+            escrever(arquivo[indice], conteudo)
+
+        def ler_gravado(indice):
+            if os.path.exists(arquivo[indice]):
+                return ler_arquivo(arquivo[indice])
+    gravar_no_destino = gravar
+
+    def gravar(indice, conteudo):
+        if (getattr(conteudo, "nao_modificado", False)
+                and ler_gravado(indice) == conteudo):
+            return
+        gravar_no_destino(indice, conteudo)
+    if manifesto is not None:
+        gravar_sem_registro = gravar
+
+        def gravar(indice, conteudo):
+            gravar_sem_registro(indice, conteudo)
+            manifesto.registrar(consulta.chave, indice + 1, conteudo)
+
+        total_de_paginas = manifesto.total_de_paginas(consulta.chave)
+        if total_de_paginas:
+            paginas = [
+                (indice, consulta.url_da_pagina(indice + 1))
+                for indice in range(total_de_paginas)
+                if not manifesto.concluida(
+                    consulta.chave, indice + 1, ler_gravado(indice) or ""
+                )
+            ]
+            baixar_paginas(gravar, paginas, trabalhadores, **opcoes)
+            if escritor:
+                escritor.esvaziar()
+            return
     total_de_paginas = 1
     i = 0
     while True:
-        resultado = executar_requisicao(consulta.seguinte)
+        resultado = executar_requisicao(consulta.seguinte, **opcoes)
         if resultado:
             resposta = Resposta(resultado)
             total_de_paginas = resposta.total_de_paginas
-            escrever_em_arquivo(arquivo[i], resultado)
+            if manifesto is not None:
+                manifesto.definir_total(consulta.chave, total_de_paginas)
+            gravar(i, resultado)
+            if trabalhadores > 1:
+                break
         elif consulta.pagina == 1:
             total_de_paginas = 2
         if consulta.pagina == total_de_paginas:
             break
         i += 1
+    paginas = [
+        (indice, consulta.seguinte)
+        for indice in range(consulta.pagina, total_de_paginas)
+    ]
+    baixar_paginas(gravar, paginas, trabalhadores, **opcoes)
+    if escritor:
+        escritor.esvaziar()
+
+
+def baixar_paginas(gravar, paginas, trabalhadores=1, **opcoes):
+    """Baixa cada (indice, url) de `paginas`, em paralelo se trabalhadores > 1."""
+    if trabalhadores <= 1 or len(paginas) <= 1:
+        for indice, url in paginas:
+            baixar_pagina(gravar, indice, url, **opcoes)
+        return
+    with ThreadPoolExecutor(max_workers=trabalhadores,
+                            initializer=iniciar_thread) as executor:
+        futuros = [
+            executor.submit(baixar_pagina, gravar, indice, url, **opcoes)
+            for indice, url in paginas
+        ]
+        for futuro in futuros:
+            futuro.result()
+
+
+def baixar_pagina(gravar, indice, url, **opcoes):
+    """Baixa `url` e, se houver resultado, chama gravar(indice, resultado)."""
+    resultado = executar_requisicao(url, **opcoes)
+    if resultado:
+        gravar(indice, resultado)
+    return resultado
+
+
+# Arquivos a partir deste tamanho sao lidos com mmap.
+LIMIAR_MMAP = 1024 * 1024
+
+
+def ler_arquivo(arquivo, codificacao="utf-8"):
+    """
+    Retorna o conteudo do arquivo como str, ou "" se nao for possivel le-lo.
 
-
-def ler_arquivo():
+    Arquivos a partir de LIMIAR_MMAP bytes sao mapeados em memoria e
+    decodificados direto do mapa, sem a copia intermediaria em bytes.
+    Arquivos gzip ou lzma sao reconhecidos pelos primeiros bytes e
+    descomprimidos aos poucos durante a leitura.
+    """
+    try:
+        with open(arquivo, "rb") as fp:
+            compressao = detectar_compressao(fp.read(6))
+            fp.seek(0)
+            if compressao:
+                with COMPRESSOES[compressao].open(
+                    fp, "rt", encoding=codificacao
+                ) as texto:
+                    return texto.read()
+            if os.fstat(fp.fileno()).st_size < LIMIAR_MMAP:
+                return fp.read().decode(codificacao)
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                return str(mapa, codificacao)
+    except UnicodeDecodeError as e:
+        logging.exception(
+            f"Arquivo {arquivo} invalido em {codificacao}: "
+            f"byte {e.object[e.start]:#04x} na posicao {e.start}."
+        )
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        logging.exception(f"Nao foi possivel ler o arquivo {arquivo}.")
     return ""
 
 
-def registrar_livros(arquivos, inserir_registros):
+@perfilavel("registrar_livros")
+def registrar_livros(arquivos, inserir_registros, em_fluxo=False,
+                     tamanho_do_lote=None, bytes_por_lote=None,
+                     trabalhadores=None, usar_threads=False,
+                     deduplicador=None):
+    """
+    Insere os documentos de cada arquivo e retorna a quantidade inserida.
+
+    Com em_fluxo=True, inserir_registros recebe um iterador que decodifica
+    os documentos sob demanda (Resposta.iter_documentos), em vez da lista.
+    Com tamanho_do_lote e/ou bytes_por_lote, os documentos de varios
+    arquivos sao agrupados em lotes desse tamanho (ver agrupar_em_lotes).
+    Com trabalhadores, os arquivos sao lidos e decodificados em paralelo
+    (ver ler_em_paralelo); inserir_registros continua sendo chamado nesta
+    thread, na ordem dos arquivos.
+    `arquivos` tambem pode ser um colecao.segmentos.ArmazemDeSegmentos,
+    cujas paginas sao lidas em sequencia.
+    Com um `deduplicador` (colecao.deduplicacao), documentos ja vistos, em
+    qualquer pagina ou consulta, nao sao inseridos nem contados; ficam em
+    deduplicador.descartados.
+    Com `perfil` (colecao.perfil.Perfil ou True), ou COLECAO_PERFIL no
+    ambiente, a execucao e perfilada com cProfile e/ou tracemalloc.
+    """
+    em_lotes = tamanho_do_lote or bytes_por_lote
+    if metricas_globais() is not None:
+        inserir_registros = instrumentar(
+            "insercao", lambda quantidade, documentos: {"documentos": quantidade}
+        )(inserir_registros)
+    if hasattr(arquivos, "conteudos"):
+        itens, ler = arquivos.conteudos(), documentos_do_conteudo
+    else:
+        itens, ler = arquivos, ler_documentos
+    if trabalhadores:
+        paginas = ler_em_paralelo(itens, trabalhadores, usar_threads, ler)
+    else:
+        paginas = (ler(item, em_fluxo or em_lotes) for item in itens)
+    if deduplicador is not None:
+        paginas = (
+            deduplicador.filtrar(documentos, em_fluxo or em_lotes)
+            for documentos in paginas
+        )
     quantidade = 0
-    for arquivo in arquivos:
-        conteudo = ler_arquivo(arquivo)
-        resposta = Resposta(conteudo)
-        quantidade += inserir_registros(resposta.documentos)
+    if em_lotes:
+        documentos = (documento for pagina in paginas for documento in pagina)
+        for lote in agrupar_em_lotes(documentos, tamanho_do_lote, bytes_por_lote):
+            quantidade += inserir_registros(lote)
+    else:
+        for documentos in paginas:
+            quantidade += inserir_registros(documentos)
     return quantidade
 
 
+def ler_documentos(arquivo, em_fluxo=False):
+    """Documentos do arquivo; com em_fluxo=True, um iterador sob demanda."""
+    return documentos_do_conteudo(ler_arquivo(arquivo), em_fluxo)
+
+
+def documentos_do_conteudo(conteudo, em_fluxo=False):
+    resposta = Resposta(conteudo)
+    if em_fluxo:
+        return resposta.iter_documentos()
+    return resposta.documentos
+
+
+def ler_em_paralelo(itens, trabalhadores, usar_threads=False,
+                    ler=ler_documentos):
+    """
+    Gera ler(item) para cada item, na ordem de `itens`, executando ler num
+    ProcessPoolExecutor (ou ThreadPoolExecutor, com usar_threads=True).
+
+    No maximo 2 * trabalhadores itens ficam lidos a frente do consumidor.
+    """
+    if usar_threads:
+        executor = ThreadPoolExecutor(max_workers=trabalhadores,
+                                      initializer=iniciar_thread)
+    else:
+        executor = ProcessPoolExecutor(max_workers=trabalhadores)
+    with executor:
+        pendentes = deque()
+        for item in itens:
+            pendentes.append(executor.submit(ler, item))
+            if len(pendentes) >= 2 * trabalhadores:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+
+def agrupar_em_lotes(documentos, tamanho_do_lote=None, bytes_por_lote=None):
+    """
+    Agrupa `documentos` em listas de ate `tamanho_do_lote` documentos e/ou
+    ate `bytes_por_lote` bytes, medidos no JSON de cada documento. Um
+    documento maior que bytes_por_lote forma um lote sozinho.
+    """
+    lote = []
+    bytes_do_lote = 0
+    for documento in documentos:
+        if bytes_por_lote:
+            tamanho = len(json.dumps(documento, ensure_ascii=False).encode())
+            if lote and bytes_do_lote + tamanho > bytes_por_lote:
+                yield lote
+                lote = []
+                bytes_do_lote = 0
+            bytes_do_lote += tamanho
+        lote.append(documento)
+        if tamanho_do_lote and len(lote) >= tamanho_do_lote:
+            yield lote
+            lote = []
+            bytes_do_lote = 0
+    if lote:
+        yield lote
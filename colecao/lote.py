@@ -0,0 +1,162 @@
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import os
+
+from colecao.livros import (Consulta,
+                            Resposta,
+                            escrever_em_arquivo,
+                            executar_requisicao,
+                            ler_arquivo,
+                            )
+from colecao.perfil import iniciar_thread, perfilavel
+
+
+class ProgressoDaConsulta:
+    """
+    Andamento de uma consulta do lote:
+        - total_de_paginas, conhecido apos a primeira resposta valida
+        - baixadas e falhas
+        - concluida, quando nao ha mais paginas a baixar
+    """
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.total_de_paginas = None
+        self.baixadas = 0
+        self.falhas = 0
+        self.concluida = False
+
+    def __repr__(self):
+        return (
+            f"ProgressoDaConsulta({self.chave!r}, {self.baixadas}+{self.falhas}"
+            f"/{self.total_de_paginas})"
+        )
+
+
+def normalizar(valor):
+    """Remove espacos repetidos; valores vazios viram None."""
+    if valor is None:
+        return None
+    return " ".join(valor.split()) or None
+
+
+def deduplicar(especificacoes):
+    """
+    Consultas distintas para os (autor, titulo, livre) de `especificacoes`,
+    na ordem em que aparecem. Especificacoes que geram os mesmos
+    dados_para_requisicao sao a mesma consulta.
+    """
+    consultas = {}
+    for autor, titulo, livre in especificacoes:
+        consulta = Consulta(normalizar(autor), normalizar(titulo),
+                            normalizar(livre))
+        consultas.setdefault(consulta.chave, consulta)
+    return list(consultas.values())
+
+
+@perfilavel("baixar_lote")
+def baixar_lote(especificacoes, arquivo=None, trabalhadores=4, escritor=None,
+                armazem=None, progresso=None, **opcoes):
+    """
+    Baixa as paginas de varias consultas num unico pool de `trabalhadores`.
+
+    As especificacoes (autor, titulo, livre) sao deduplicadas e as paginas
+    sao distribuidas em rodizio entre as consultas, para que consultas
+    pequenas nao esperem o fim de uma consulta grande. A pagina 1 de cada
+    consulta informa o total de paginas; se falhar, a pagina 2 e tentada,
+    como em baixar_livros.
+    As paginas sao gravadas em arquivo(chave, pagina), pelo `escritor` se
+    houver, ou no `armazem` (colecao.segmentos.ArmazemDeSegmentos). Paginas
+    nao modificadas so nao sao regravadas se o destino ja tiver o mesmo
+    conteudo.
+    `progresso`, se informado, e chamado com o ProgressoDaConsulta a cada
+    pagina processada. As `opcoes` sao repassadas para executar_requisicao.
+    Com `perfil` (colecao.perfil.Perfil ou True), ou COLECAO_PERFIL no
+    ambiente, a execucao e perfilada com cProfile e/ou tracemalloc.
+
+    Retorna {chave: ProgressoDaConsulta}.
+    """
+    if armazem is not None:
+        gravar_no_destino = armazem.gravar
+        ler_gravado = armazem.ler
+    elif arquivo is not None:
+        escrever = escritor.escrever if escritor else escrever_em_arquivo
+
+        def gravar_no_destino(chave, pagina, conteudo):
+            escrever(arquivo(chave, pagina), conteudo)
+
+        def ler_gravado(chave, pagina):
+            caminho = arquivo(chave, pagina)
+            if os.path.exists(caminho):
+                return ler_arquivo(caminho)
+    else:
+        raise ValueError("Informe arquivo ou armazem.")
+
+    def gravar(chave, pagina, conteudo):
+        if (getattr(conteudo, "nao_modificado", False)
+                and ler_gravado(chave, pagina) == conteudo):
+            return
+        gravar_no_destino(chave, pagina, conteudo)
+
+    consultas = deduplicar(especificacoes)
+    andamento = {consulta.chave: ProgressoDaConsulta(consulta.chave)
+                 for consulta in consultas}
+    pendentes = {consulta.chave: deque() for consulta in consultas}
+    rodizio = deque()
+    em_voo = {}
+    em_voo_por_chave = Counter()
+
+    def agendar(consulta, paginas):
+        fila = pendentes[consulta.chave]
+        if not fila and paginas:
+            rodizio.append(consulta)
+        fila.extend(paginas)
+
+    for consulta in consultas:
+        agendar(consulta, [1])
+    with ThreadPoolExecutor(max_workers=trabalhadores,
+                            initializer=iniciar_thread) as executor:
+        while rodizio or em_voo:
+            while rodizio and len(em_voo) < trabalhadores:
+                consulta = rodizio.popleft()
+                fila = pendentes[consulta.chave]
+                pagina = fila.popleft()
+                if fila:
+                    rodizio.append(consulta)
+                futuro = executor.submit(
+                    baixar_pagina_do_lote, gravar, consulta.chave, pagina,
+                    consulta.url_da_pagina(pagina), **opcoes
+                )
+                em_voo[futuro] = (consulta, pagina)
+                em_voo_por_chave[consulta.chave] += 1
+            feitos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                consulta, pagina = em_voo.pop(futuro)
+                em_voo_por_chave[consulta.chave] -= 1
+                estado = andamento[consulta.chave]
+                resultado = futuro.result()
+                if resultado:
+                    estado.baixadas += 1
+                    if estado.total_de_paginas is None:
+                        estado.total_de_paginas = Resposta(resultado).total_de_paginas
+                        agendar(consulta, range(pagina + 1,
+                                                estado.total_de_paginas + 1))
+                else:
+                    estado.falhas += 1
+                    if estado.total_de_paginas is None and pagina == 1:
+                        agendar(consulta, [2])
+                estado.concluida = (not pendentes[consulta.chave]
+                                    and not em_voo_por_chave[consulta.chave])
+                if progresso:
+                    progresso(estado)
+    if escritor:
+        escritor.esvaziar()
+    return andamento
+
+
+def baixar_pagina_do_lote(gravar, chave, pagina, url, **opcoes):
+    """Baixa `url` e, se houver resultado, chama gravar(chave, pagina, resultado)."""
+    resultado = executar_requisicao(url, **opcoes)
+    if resultado:
+        gravar(chave, pagina, resultado)
+    return resultado
@@ -0,0 +1,97 @@
+from hashlib import sha256
+import os
+import threading
+
+
+class Manifesto:
+    """
+    Registro das paginas ja gravadas de cada consulta, para retomar um
+    download interrompido. O arquivo recebe uma linha por evento:
+        total   <chave>  <total de paginas>
+        pagina  <chave>  <pagina>  <sha256 do conteudo>
+    A chave identifica a consulta (Consulta.chave).
+    """
+
+    def __init__(self, caminho):
+        self._caminho = caminho
+        self._totais = {}
+        self._paginas = {}
+        self._trava = threading.Lock()
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._carregar()
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+
+    def total_de_paginas(self, chave):
+        """Total de paginas da consulta, ou None se ainda nao for conhecido."""
+        with self._trava:
+            return self._totais.get(chave)
+
+    def definir_total(self, chave, total_de_paginas):
+        with self._trava:
+            if self._totais.get(chave) == total_de_paginas:
+                return
+            self._totais[chave] = total_de_paginas
+            self._anotar(f"total\t{chave}\t{total_de_paginas}")
+
+    def registrar(self, chave, pagina, conteudo):
+        """Anota que `pagina` da consulta foi gravada com `conteudo`."""
+        soma = self.soma_de_verificacao(conteudo)
+        with self._trava:
+            self._paginas.setdefault(chave, {})[pagina] = soma
+            self._anotar(f"pagina\t{chave}\t{pagina}\t{soma}")
+
+    def concluida(self, chave, pagina, conteudo_gravado=None):
+        """
+        Indica se a pagina foi registrada e, se `conteudo_gravado` for
+        informado, se ele ainda corresponde ao que foi registrado.
+        """
+        with self._trava:
+            soma = self._paginas.get(chave, {}).get(pagina)
+        if soma is None:
+            return False
+        if conteudo_gravado is None:
+            return True
+        return soma == self.soma_de_verificacao(conteudo_gravado)
+
+    def paginas_concluidas(self, chave):
+        with self._trava:
+            return sorted(self._paginas.get(chave, {}))
+
+    def fechar(self):
+        with self._trava:
+            self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, param1, param2, param3):
+        self.fechar()
+
+    @staticmethod
+    def soma_de_verificacao(conteudo):
+        return sha256(conteudo.encode()).hexdigest()
+
+    def _anotar(self, linha):
+        self._arquivo.write(linha + "\n")
+        self._arquivo.flush()
+
+    def _carregar(self):
+        if not os.path.exists(self._caminho):
+            return
+        validos = 0
+        with open(self._caminho, "rb") as fp:
+            for linha in fp:
+                # Uma linha sem \n foi interrompida no meio da gravacao.
+                if not linha.endswith(b"\n"):
+                    break
+                tipo, chave, *valores = linha[:-1].decode("utf-8").split("\t")
+                if tipo == "total":
+                    self._totais[chave] = int(valores[0])
+                elif tipo == "pagina":
+                    pagina, soma = valores
+                    self._paginas.setdefault(chave, {})[int(pagina)] = soma
+                validos += len(linha)
+        if validos < os.path.getsize(self._caminho):
+            os.truncate(self._caminho, validos)
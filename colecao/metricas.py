@@ -0,0 +1,180 @@
+from bisect import bisect_left
+from functools import wraps
+import json
+import threading
+import time
+
+
+# Limites superiores (segundos) das faixas dos histogramas de latencia.
+LIMITES_PADRAO = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histograma:
+    """Contagem de observacoes por faixa (limite superior), com soma e total."""
+
+    def __init__(self, limites=LIMITES_PADRAO):
+        self.limites = tuple(limites)
+        self.contagens = [0] * (len(self.limites) + 1)
+        self.soma = 0.0
+        self.quantidade = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.quantidade += 1
+
+    def percentil(self, p):
+        """Limite superior da faixa que contem o percentil `p` (0 a 100)."""
+        if not self.quantidade:
+            return None
+        alvo = self.quantidade * p / 100
+        acumulado = 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+    def para_dict(self):
+        return {
+            "limites": list(self.limites),
+            "contagens": list(self.contagens),
+            "soma": self.soma,
+            "quantidade": self.quantidade,
+            "p50": self.percentil(50),
+            "p99": self.percentil(99),
+        }
+
+
+class Metricas:
+    """
+    Latencia e contadores por etapa (requisicao, decodificacao, escrita,
+    insercao...):
+        - um Histograma de latencia por etapa
+        - contadores por etapa: chamadas, erros, bytes, documentos
+        - callbacks registrados com ao_observar(funcao) recebem
+          (etapa, segundos, contadores da observacao)
+    Exporta com instantaneo() (dict), para_json() e para_prometheus().
+    """
+
+    def __init__(self, limites=LIMITES_PADRAO):
+        self._limites = limites
+        self._histogramas = {}
+        self._contadores = {}
+        self._callbacks = []
+        self._trava = threading.Lock()
+
+    def ao_observar(self, callback):
+        self._callbacks.append(callback)
+        return callback
+
+    def observar(self, etapa, segundos, erro=False, **contadores):
+        """Registra uma execucao da `etapa`; `contadores` sao somados."""
+        with self._trava:
+            histograma = self._histogramas.get(etapa)
+            if histograma is None:
+                histograma = self._histogramas[etapa] = Histograma(self._limites)
+                self._contadores[etapa] = {"chamadas": 0, "erros": 0}
+            histograma.observar(segundos)
+            totais = self._contadores[etapa]
+            totais["chamadas"] += 1
+            if erro:
+                totais["erros"] += 1
+            for nome, valor in contadores.items():
+                totais[nome] = totais.get(nome, 0) + valor
+        for callback in self._callbacks:
+            callback(etapa, segundos, contadores)
+
+    def instantaneo(self):
+        with self._trava:
+            return {
+                etapa: {
+                    "latencia": histograma.para_dict(),
+                    **self._contadores[etapa],
+                }
+                for etapa, histograma in self._histogramas.items()
+            }
+
+    def para_json(self):
+        return json.dumps(self.instantaneo())
+
+    def para_prometheus(self, prefixo="colecao"):
+        """Texto no formato de exposicao do Prometheus."""
+        linhas = [
+            f"# TYPE {prefixo}_latencia_segundos histogram",
+        ]
+        instantaneo = self.instantaneo()
+        for etapa, dados in instantaneo.items():
+            latencia = dados["latencia"]
+            acumulado = 0
+            for limite, contagem in zip(latencia["limites"] + ["+Inf"],
+                                        latencia["contagens"]):
+                acumulado += contagem
+                linhas.append(
+                    f'{prefixo}_latencia_segundos_bucket{{etapa="{etapa}",'
+                    f'le="{limite}"}} {acumulado}'
+                )
+            linhas.append(
+                f'{prefixo}_latencia_segundos_sum{{etapa="{etapa}"}} {latencia["soma"]}'
+            )
+            linhas.append(
+                f'{prefixo}_latencia_segundos_count{{etapa="{etapa}"}} {latencia["quantidade"]}'
+            )
+        nomes = sorted({
+            nome for dados in instantaneo.values() for nome in dados
+            if nome != "latencia"
+        })
+        for nome in nomes:
+            linhas.append(f"# TYPE {prefixo}_{nome}_total counter")
+            for etapa, dados in instantaneo.items():
+                if nome in dados:
+                    linhas.append(
+                        f'{prefixo}_{nome}_total{{etapa="{etapa}"}} {dados[nome]}'
+                    )
+        return "\n".join(linhas) + "\n"
+
+
+_metricas_globais = None
+
+
+def definir_metricas_globais(metricas):
+    """Liga (Metricas) ou desliga (None) a instrumentacao deste processo."""
+    global _metricas_globais
+    _metricas_globais = metricas
+
+
+def metricas_globais():
+    return _metricas_globais
+
+
+def instrumentar(etapa, contar=None):
+    """
+    Decorador que observa a `etapa` nas Metricas globais a cada chamada.
+    contar(resultado, *args, **kwargs) retorna os contadores da chamada.
+    Desligado, custa uma leitura de variavel global por chamada.
+    """
+    def decorador(funcao):
+        @wraps(funcao)
+        def instrumentada(*args, **kwargs):
+            metricas = _metricas_globais
+            if metricas is None:
+                return funcao(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except BaseException:
+                metricas.observar(etapa, time.perf_counter() - inicio, erro=True)
+                raise
+            segundos = time.perf_counter() - inicio
+            contadores = contar(resultado, *args, **kwargs) if contar else {}
+            metricas.observar(etapa, segundos, **contadores)
+            return resultado
+        return instrumentada
+    return decorador
+
+
+def tamanho_em_bytes(texto):
+    return len(texto.encode()) if isinstance(texto, str) else 0
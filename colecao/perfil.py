@@ -0,0 +1,202 @@
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+import cProfile
+import logging
+import os
+import pstats
+import random
+import threading
+import tracemalloc
+
+
+class Perfil:
+    """
+    Captura de perfil de uma execucao:
+        - cpu: cProfile, gravado em <nome>-<instante>-<pid>.pstats; as
+          threads trabalhadoras que a execucao cria (ThreadPoolExecutor com
+          initializer=iniciar_thread, como em baixar_livros e baixar_lote)
+          tem perfis proprios, somados ao da thread que chamou. As demais
+          threads do processo, como a do EscritorDeArquivos, ficam de fora.
+        - memoria: tracemalloc, com as `top` linhas que mais alocaram e o
+          pico, em <nome>-<instante>-<pid>-memoria.txt
+        - amostragem: fracao das execucoes perfiladas (0 a 1), para deixar
+          ligado sob carga
+        - quadros: quadros de pilha guardados por alocacao
+    Os arquivos gravados sao acrescentados a `arquivos`.
+    """
+
+    def __init__(self, cpu=True, memoria=False, diretorio="perfis",
+                 amostragem=1.0, top=20, quadros=1):
+        self.cpu = cpu
+        self.memoria = memoria
+        self.diretorio = diretorio
+        self.amostragem = amostragem
+        self.top = top
+        self.quadros = quadros
+        self.arquivos = []
+
+    @classmethod
+    def do_ambiente(cls, ambiente=None):
+        """
+        Perfil definido pelas variaveis de ambiente, ou None se desligado:
+            COLECAO_PERFIL=cpu, memoria ou cpu,memoria (1 equivale a cpu)
+            COLECAO_PERFIL_DIRETORIO, COLECAO_PERFIL_AMOSTRAGEM,
+            COLECAO_PERFIL_TOP, COLECAO_PERFIL_QUADROS
+        """
+        ambiente = os.environ if ambiente is None else ambiente
+        tipos = {
+            tipo.strip().lower()
+            for tipo in ambiente.get("COLECAO_PERFIL", "").split(",")
+        } - {"", "0"}
+        if not tipos:
+            return None
+        return cls(
+            cpu=bool(tipos & {"1", "cpu"}),
+            memoria="memoria" in tipos,
+            diretorio=ambiente.get("COLECAO_PERFIL_DIRETORIO", "perfis"),
+            amostragem=float(ambiente.get("COLECAO_PERFIL_AMOSTRAGEM", 1.0)),
+            top=int(ambiente.get("COLECAO_PERFIL_TOP", 20)),
+            quadros=int(ambiente.get("COLECAO_PERFIL_QUADROS", 1)),
+        )
+
+    def sortear(self):
+        return self.amostragem >= 1 or random.random() < self.amostragem
+
+    def caminho(self, nome):
+        """Caminho, sem extensao, dos arquivos de uma execucao de `nome`."""
+        instante = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return os.path.join(self.diretorio, f"{nome}-{instante}-{os.getpid()}")
+
+
+# Um unico perfil por vez no processo: cProfile nao aceita perfis
+# aninhados, e o tracemalloc e global.
+_trava = threading.Lock()
+
+# Perfiladores da execucao perfilada com cpu em andamento, ou None; as
+# threads trabalhadoras acrescentam os seus em iniciar_thread.
+_perfiladores = None
+
+
+@contextmanager
+def perfilar(nome, perfil=None):
+    """
+    Executa o bloco sob `perfil` (Perfil, True para o padrao, False para
+    nunca perfilar ou None para usar o ambiente).
+    """
+    global _perfiladores
+    if perfil is None:
+        perfil = Perfil.do_ambiente()
+    elif perfil is True:
+        perfil = Perfil()
+    if not perfil or not perfil.sortear() or not _trava.acquire(blocking=False):
+        yield None
+        return
+    try:
+        try:
+            os.makedirs(perfil.diretorio, exist_ok=True)
+        except OSError:
+            logging.exception(
+                f"Nao foi possivel criar o diretorio {perfil.diretorio}."
+            )
+            yield None
+            return
+        perfiladores = []
+        perfilador = cProfile.Profile() if perfil.cpu else None
+        rastrear = perfil.memoria and not tracemalloc.is_tracing()
+        if rastrear:
+            tracemalloc.start(perfil.quadros)
+        if perfilador:
+            perfiladores.append(perfilador)
+            _perfiladores = perfiladores
+            perfilador.enable()
+        try:
+            yield perfil
+        finally:
+            if perfilador:
+                perfilador.disable()
+                _perfiladores = None
+            gravar_perfil(nome, perfil, perfiladores)
+            if rastrear:
+                tracemalloc.stop()
+    finally:
+        _trava.release()
+
+
+def iniciar_thread():
+    """
+    initializer de ThreadPoolExecutor: durante uma execucao perfilada com
+    cpu, liga um cProfile na thread trabalhadora, somado ao perfil da
+    execucao. O perfil vale ate o fim da thread, entao o executor deve ser
+    encerrado dentro da execucao.
+    """
+    perfiladores = _perfiladores
+    if perfiladores is None:
+        return
+    perfilador = cProfile.Profile()
+    perfiladores.append(perfilador)
+    perfilador.enable()
+
+
+def somar_perfis(perfiladores):
+    """pstats.Stats com a soma dos perfiladores que registraram chamadas."""
+    estatisticas = None
+    for perfilador in perfiladores:
+        perfilador.create_stats()
+        if not perfilador.stats:
+            continue
+        if estatisticas is None:
+            estatisticas = pstats.Stats(perfilador)
+        else:
+            estatisticas.add(perfilador)
+    return estatisticas
+
+
+def gravar_perfil(nome, perfil, perfiladores):
+    caminho = perfil.caminho(nome)
+    arquivos = []
+    estatisticas = somar_perfis(perfiladores)
+    if estatisticas:
+        arquivos.append((caminho + ".pstats", estatisticas.dump_stats))
+    if perfil.memoria:
+        arquivos.append((
+            caminho + "-memoria.txt",
+            lambda arquivo: gravar_relatorio_de_memoria(arquivo, perfil.top),
+        ))
+    for arquivo, gravar in arquivos:
+        try:
+            gravar(arquivo)
+        except OSError:
+            logging.exception(f"Nao foi possivel gravar o perfil {arquivo}.")
+        else:
+            perfil.arquivos.append(arquivo)
+
+
+def gravar_relatorio_de_memoria(arquivo, top=20):
+    """Grava as `top` linhas que mais alocaram e o pico de memoria rastreada."""
+    instantaneo = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    atual, pico = tracemalloc.get_traced_memory()
+    with open(arquivo, "w") as fp:
+        fp.write(f"Memoria rastreada: atual {atual} bytes, pico {pico} bytes\n")
+        fp.write(f"Top {top} linhas por memoria alocada:\n")
+        for posicao, estatistica in enumerate(
+            instantaneo.statistics("lineno")[:top], 1
+        ):
+            fp.write(f"{posicao:>3}. {estatistica}\n")
+
+
+def perfilavel(nome):
+    """
+    Decorador que aceita o argumento `perfil` (ver perfilar) e executa a
+    funcao sob ele; sem o argumento, vale o ambiente (COLECAO_PERFIL).
+    """
+    def decorador(funcao):
+        @wraps(funcao)
+        def perfilada(*args, perfil=None, **kwargs):
+            with perfilar(nome, perfil):
+                return funcao(*args, **kwargs)
+        return perfilada
+    return decorador
@@ -0,0 +1,123 @@
+from email.utils import parsedate_to_datetime
+from urllib.error import HTTPError
+import datetime
+import random
+import threading
+
+
+# Status com que o servico pede para diminuir o ritmo.
+STATUS_DE_SOBRECARGA = (429, 503)
+
+
+def indica_sobrecarga(erro):
+    return isinstance(erro, HTTPError) and erro.code in STATUS_DE_SOBRECARGA
+
+
+class PoliticaDeRetentativa:
+    """
+    Quando e quanto esperar antes de repetir uma requisicao:
+        - no maximo `tentativas` tentativas, contando a primeira
+        - espera exponencial (espera_base * 2 ** tentativa), limitada a
+          espera_maxima e sorteada entre 0 e esse valor (jitter completo)
+        - 429 e 503 respeitam o cabecalho Retry-After, se houver
+        - outros 5xx e erros de rede (URLError, OSError como timeout ou
+          conexao reiniciada, http.client.HTTPException) sao repetidos;
+          4xx nao
+    """
+
+    def __init__(self, tentativas=4, espera_base=0.5, espera_maxima=30.0,
+                 jitter=True):
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.jitter = jitter
+
+    def deve_repetir(self, erro, tentativa):
+        """Indica se a `tentativa` (0 = primeira) que falhou com `erro` deve ser repetida."""
+        if tentativa + 1 >= self.tentativas:
+            return False
+        if isinstance(erro, HTTPError):
+            return erro.code in STATUS_DE_SOBRECARGA or erro.code >= 500
+        return True
+
+    def espera(self, tentativa, erro=None):
+        """Segundos a esperar antes de repetir a `tentativa` que falhou."""
+        if indica_sobrecarga(erro):
+            pedido = self._retry_after(erro)
+            if pedido is not None:
+                return min(pedido, self.espera_maxima)
+        espera = min(self.espera_base * 2 ** tentativa, self.espera_maxima)
+        if self.jitter:
+            return random.uniform(0, espera)
+        return espera
+
+    def _retry_after(self, erro):
+        valor = erro.headers.get("Retry-After") if erro.headers else None
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            pass
+        try:
+            data = parsedate_to_datetime(valor)
+        except (TypeError, ValueError):
+            return None
+        agora = datetime.datetime.now(datetime.timezone.utc)
+        return max(0.0, (data - agora).total_seconds())
+
+
+class ControleDeConcorrencia:
+    """
+    Limite de requisicoes simultaneas ajustado por AIMD:
+        - cada sucesso soma 1 / limite (cerca de +1 por rodada de sucessos)
+        - cada sobrecarga (429/503) multiplica o limite por fator_de_reducao
+    O limite fica entre `minimo` e `maximo`.
+    """
+
+    def __init__(self, inicial=4, minimo=1, maximo=64, fator_de_reducao=0.5):
+        self._minimo = minimo
+        self._maximo = maximo
+        self._fator_de_reducao = fator_de_reducao
+        self._limite = float(inicial)
+        self._em_andamento = 0
+        self._condicao = threading.Condition()
+
+    @property
+    def limite(self):
+        with self._condicao:
+            return int(self._limite)
+
+    @property
+    def em_andamento(self):
+        with self._condicao:
+            return self._em_andamento
+
+    def adquirir(self):
+        with self._condicao:
+            while self._em_andamento >= int(self._limite):
+                self._condicao.wait()
+            self._em_andamento += 1
+
+    def liberar(self):
+        with self._condicao:
+            self._em_andamento -= 1
+            self._condicao.notify()
+
+    def sucesso(self):
+        with self._condicao:
+            limite = min(self._maximo, self._limite + 1 / self._limite)
+            if int(limite) > int(self._limite):
+                self._condicao.notify()
+            self._limite = limite
+
+    def sobrecarga(self):
+        with self._condicao:
+            self._limite = max(self._minimo, self._limite * self._fator_de_reducao)
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, param1, param2, param3):
+        self.liberar()
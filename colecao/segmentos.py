@@ -0,0 +1,136 @@
+import os
+import threading
+
+
+class ArmazemDeSegmentos:
+    """
+    Paginas acrescentadas em arquivos de segmento, em vez de um arquivo por
+    pagina:
+        - segmento-000001.dat, segmento-000002.dat, ... recebem as paginas
+          em sequencia; um novo segmento comeca quando o atual passaria de
+          `tamanho_do_segmento` bytes
+        - indice.tsv guarda (chave, pagina) -> (segmento, posicao, tamanho),
+          uma linha por pagina gravada; a ultima linha de uma pagina vale
+    A chave identifica a consulta (Consulta.chave).
+    """
+
+    nome_do_indice = "indice.tsv"
+
+    def __init__(self, diretorio, tamanho_do_segmento=64 * 1024 * 1024):
+        self._diretorio = diretorio
+        self._tamanho_do_segmento = tamanho_do_segmento
+        self._indice = {}
+        self._trava = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+        self._carregar_indice()
+        self._segmento = max(
+            (segmento for segmento, _, _ in self._indice.values()), default=1
+        )
+        self._arquivo_do_segmento = open(self._caminho(self._segmento), "ab")
+        self._arquivo_do_indice = open(
+            os.path.join(diretorio, self.nome_do_indice), "a", encoding="utf-8"
+        )
+
+    def gravar(self, chave, pagina, conteudo):
+        dados = conteudo.encode()
+        with self._trava:
+            posicao = self._arquivo_do_segmento.tell()
+            if posicao and posicao + len(dados) > self._tamanho_do_segmento:
+                self._arquivo_do_segmento.close()
+                self._segmento += 1
+                self._arquivo_do_segmento = open(
+                    self._caminho(self._segmento), "ab"
+                )
+                posicao = 0
+            self._arquivo_do_segmento.write(dados)
+            self._arquivo_do_segmento.flush()
+            self._arquivo_do_indice.write(
+                f"{chave}\t{pagina}\t{self._segmento}\t{posicao}\t{len(dados)}\n"
+            )
+            self._arquivo_do_indice.flush()
+            self._indice[(chave, pagina)] = (self._segmento, posicao, len(dados))
+
+    def ler(self, chave, pagina):
+        """Conteudo da pagina `pagina` da consulta `chave`, ou None."""
+        with self._trava:
+            localizacao = self._indice.get((chave, pagina))
+        if localizacao is None:
+            return None
+        segmento, posicao, tamanho = localizacao
+        with open(self._caminho(segmento), "rb") as fp:
+            fp.seek(posicao)
+            return fp.read(tamanho).decode()
+
+    def paginas(self):
+        """(chave, pagina) de cada pagina, na ordem em que estao gravadas."""
+        return [chave_e_pagina for chave_e_pagina, _ in self._em_ordem()]
+
+    def conteudos(self):
+        """Gera o conteudo de cada pagina, lendo cada segmento em sequencia."""
+        for _, conteudo in self._ler_em_ordem():
+            yield conteudo
+
+    def __iter__(self):
+        """Gera (chave, pagina, conteudo), lendo cada segmento em sequencia."""
+        for (chave, pagina), conteudo in self._ler_em_ordem():
+            yield chave, pagina, conteudo
+
+    def __len__(self):
+        return len(self._indice)
+
+    def __contains__(self, chave_e_pagina):
+        return chave_e_pagina in self._indice
+
+    def fechar(self):
+        with self._trava:
+            self._arquivo_do_segmento.close()
+            self._arquivo_do_indice.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, param1, param2, param3):
+        self.fechar()
+
+    def _caminho(self, segmento):
+        return os.path.join(self._diretorio, f"segmento-{segmento:06d}.dat")
+
+    def _em_ordem(self):
+        with self._trava:
+            return sorted(self._indice.items(), key=lambda item: item[1])
+
+    def _ler_em_ordem(self):
+        fp = None
+        segmento_aberto = None
+        try:
+            for chave_e_pagina, (segmento, posicao, tamanho) in self._em_ordem():
+                if segmento != segmento_aberto:
+                    if fp:
+                        fp.close()
+                    fp = open(self._caminho(segmento), "rb")
+                    segmento_aberto = segmento
+                fp.seek(posicao)
+                yield chave_e_pagina, fp.read(tamanho).decode()
+        finally:
+            if fp:
+                fp.close()
+
+    def _carregar_indice(self):
+        caminho = os.path.join(self._diretorio, self.nome_do_indice)
+        if not os.path.exists(caminho):
+            return
+        validos = 0
+        with open(caminho, "rb") as fp:
+            for linha in fp:
+                # Uma linha sem \n foi interrompida no meio da gravacao.
+                if not linha.endswith(b"\n"):
+                    break
+                chave, pagina, segmento, posicao, tamanho = (
+                    linha[:-1].decode("utf-8").split("\t")
+                )
+                self._indice[(chave, int(pagina))] = (
+                    int(segmento), int(posicao), int(tamanho)
+                )
+                validos += len(linha)
+        if validos < os.path.getsize(caminho):
+            os.truncate(caminho, validos)
@@ -0,0 +1,59 @@
+from hashlib import sha256
+import json
+import os
+import threading
+
+
+class RepositorioDeValidadores:
+    """
+    ETag e Last-Modified da ultima resposta de cada URL, com o conteudo
+    correspondente, para requisicoes condicionais (If-None-Match e
+    If-Modified-Since). Um arquivo JSON por URL em `diretorio`.
+    """
+
+    def __init__(self, diretorio):
+        self._diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def cabecalhos(self, url):
+        """Cabecalhos condicionais para `url`; vazio se nada foi guardado."""
+        registro = self._ler(url)
+        if not registro:
+            return {}
+        cabecalhos = {}
+        if registro.get("etag"):
+            cabecalhos["If-None-Match"] = registro["etag"]
+        if registro.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = registro["last_modified"]
+        return cabecalhos
+
+    def conteudo(self, url):
+        registro = self._ler(url)
+        return registro["conteudo"] if registro else None
+
+    def guardar(self, url, cabecalhos, conteudo):
+        """Guarda os validadores de `cabecalhos`, se a resposta tiver algum."""
+        etag = cabecalhos.get("ETag") if cabecalhos else None
+        last_modified = cabecalhos.get("Last-Modified") if cabecalhos else None
+        if not etag and not last_modified:
+            return
+        caminho = self._caminho(url)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as fp:
+            json.dump({
+                "etag": etag,
+                "last_modified": last_modified,
+                "conteudo": conteudo,
+            }, fp)
+        os.replace(temporario, caminho)
+
+    def _ler(self, url):
+        try:
+            with open(self._caminho(url), encoding="utf-8") as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def _caminho(self, url):
+        nome = sha256(url.encode()).hexdigest()
+        return os.path.join(self._diretorio, nome + ".json")
@@ -1,4 +1,9 @@
 from setuptools import setup, find_packages
 
-setup(name="colecao", packages=find_packages())
-
+setup(
+    name="colecao",
+    packages=find_packages(),
+    entry_points={
+        "console_scripts": ["colecao=colecao.cli:main"],
+    },
+)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+from http.client import HTTPMessage
+import pytest
+from unittest.mock import patch, call
+from urllib.error import URLError
+from urllib.parse import urlsplit, parse_qs
+from colecao.assincrono import (consultar_livros_async,
+                                executar_requisicao_async,
+                                baixar_livros_async,
+                                )
+from colecao.livros import Resposta
+
+
+class StubEscritor:
+    def __init__(self):
+        self.enviado = b""
+
+    def write(self, dados):
+        self.enviado += dados
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+def stub_open_connection(*respostas):
+    conexoes = []
+    respostas = list(respostas)
+
+    async def open_connection(host, porta, ssl=None):
+        leitor = asyncio.StreamReader()
+        leitor.feed_data(respostas.pop(0))
+        leitor.feed_eof()
+        escritor = StubEscritor()
+        conexoes.append((host, porta, escritor))
+        return leitor, escritor
+
+    open_connection.conexoes = conexoes
+    return open_connection
+
+
+def resposta_http(corpo, status="200 OK"):
+    corpo = corpo.encode()
+    return (
+        f"HTTP/1.1 {status}\r\nContent-Length: {len(corpo)}\r\n\r\n".encode()
+        + corpo
+    )
+
+
+def test_quando_executar_requisicao_async_deve_retornar_string():
+    with patch("colecao.assincrono.open_connection",
+               stub_open_connection(resposta_http('{"docs": []}'))) as stub:
+        resultado = asyncio.run(
+            executar_requisicao_async("https://buscarlivros?author=J+K+Rowlings")
+        )
+        assert resultado == '{"docs": []}'
+        host, porta, escritor = stub.conexoes[0]
+        assert (host, porta) == ("buscarlivros", 443)
+        assert escritor.enviado.startswith(
+            b"GET /?author=J+K+Rowlings HTTP/1.1\r\nHost: buscarlivros\r\n"
+        )
+
+
+def test_quando_executar_requisicao_async_deve_ler_corpo_em_partes():
+    resposta = (
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+        b"5\r\n{\"doc\r\n6\r\ns\": []\r\n1\r\n}\r\n0\r\n\r\n"
+    )
+    with patch("colecao.assincrono.open_connection",
+               stub_open_connection(resposta)):
+        resultado = asyncio.run(executar_requisicao_async("http://buscarlivros"))
+        assert resultado == '{"docs": []}'
+
+
+def test_quando_executar_requisicao_async_deve_logar_http_error(caplog):
+    with patch("colecao.assincrono.open_connection",
+               stub_open_connection(resposta_http("", "500 Erro interno"))):
+        resultado = asyncio.run(executar_requisicao_async("https://buscador"))
+        assert resultado is None
+        assert len(caplog.records) == 1
+        assert "Erro interno" in caplog.records[0].message
+
+
+def test_quando_executar_requisicao_async_recebe_redirecionamento_deve_logar_http_error(caplog):
+    with patch("colecao.assincrono.open_connection",
+               stub_open_connection(resposta_http("", "302 Found"))):
+        resultado = asyncio.run(executar_requisicao_async("https://buscador"))
+        assert resultado is None
+        assert "Found" in caplog.records[0].message
+
+
+@pytest.mark.parametrize("erro", [ConnectionRefusedError(), asyncio.TimeoutError()])
+def test_quando_executar_requisicao_async_nao_conecta_deve_levantar_url_error(erro):
+    async def open_connection(host, porta, ssl=None):
+        raise erro
+
+    with patch("colecao.assincrono.open_connection", open_connection):
+        with pytest.raises(URLError):
+            asyncio.run(executar_requisicao_async("https://buscador"))
+
+
+def test_quando_executar_requisicao_async_deve_usar_charset_da_resposta():
+    corpo = '{"author": "Jos\u00e9"}'.encode("iso-8859-1")
+    resposta = (
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=iso-8859-1\r\n"
+        + f"Content-Length: {len(corpo)}\r\n\r\n".encode() + corpo
+    )
+    with patch("colecao.assincrono.open_connection", stub_open_connection(resposta)):
+        resultado = asyncio.run(executar_requisicao_async("https://buscador"))
+        assert resultado == '{"author": "Jos\u00e9"}'
+
+
+def test_quando_consultar_livros_async_deve_retornar_uma_string():
+    with patch("colecao.assincrono.open_connection",
+               stub_open_connection(resposta_http(""))) as stub:
+        resultado = asyncio.run(consultar_livros_async("Agatha Christie"))
+        assert type(resultado) == str
+        _, _, escritor = stub.conexoes[0]
+        assert b"GET /?autor=Agatha+Christie " in escritor.enviado
+
+
+def test_quando_consultar_livros_async_deve_usar_endereco_do_buscador():
+    with patch("colecao.assincrono.open_connection",
+               stub_open_connection(resposta_http(""))) as stub, \
+            patch("colecao.livros.ENDERECO_DO_BUSCADOR", "http://localhost:8080/buscador"):
+        asyncio.run(consultar_livros_async("Agatha Christie"))
+        host, porta, escritor = stub.conexoes[0]
+        assert (host, porta) == ("localhost", 8080)
+        assert b"GET /buscador?autor=Agatha+Christie " in escritor.enviado
+
+
+@pytest.fixture
+def paginas_da_consulta():
+    return [
+        json.dumps({"num_docs": 5, "docs": [
+            {"author": "Luciano Ramalho", "title": "Python Fluent"},
+            {"author": "Nilo Neil", "title": "Introducao a Programacao com Python"},
+        ]}),
+        json.dumps({"num_docs": 5, "docs": [
+            {"author": "Allen B. Downey", "title": "Pense em Python"},
+            {"author": "Kenneth Reitz", "title": "O Guia do Mochileiro Python"},
+        ]}),
+        json.dumps({"num_docs": 5, "docs": [
+            {"author": "Wes McKinney", "title": "Python Para Analise de Dados"},
+        ]}),
+    ]
+
+
+def test_quando_baixar_livros_async_deve_escrever_paginas_nos_arquivos(paginas_da_consulta):
+    async def requisitar(url):
+        pagina = int(parse_qs(urlsplit(url).query)["page"][0])
+        return 200, "OK", HTTPMessage(), paginas_da_consulta[pagina - 1].encode()
+
+    Resposta.quantidade_documentos_por_pagina = 2
+    arquivo = [
+        "/tmp/arquivo1",
+        "/tmp/arquivo2",
+        "/tmp/arquivo3"
+    ]
+    with patch("colecao.assincrono.requisitar", requisitar):
+        with patch("colecao.assincrono.escrever_em_arquivo") as mock_escrever:
+            asyncio.run(baixar_livros_async(arquivo, None, None, "Python"))
+            assert sorted(mock_escrever.call_args_list) == [
+                call(arquivo[0], paginas_da_consulta[0]),
+                call(arquivo[1], paginas_da_consulta[1]),
+                call(arquivo[2], paginas_da_consulta[2]),
+            ]
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+from colecao.cache import CacheEmDisco, CacheEmMemoria
+from colecao.livros import executar_requisicao, consultar_livros
+from test_livros import StubHTTPResponse
+
+
+def test_quando_url_nao_esta_no_cache_deve_retornar_none(tmp_path):
+    cache = CacheEmDisco(tmp_path)
+    assert cache.obter("https://buscarlivros?q=Python&page=1") is None
+    assert cache.estatisticas["falhas"] == 1
+
+
+def test_quando_guardar_conteudo_deve_obter_o_mesmo_conteudo(tmp_path):
+    cache = CacheEmDisco(tmp_path)
+    cache.guardar("https://buscarlivros?q=Python&page=1", '{"docs": []}')
+    assert cache.obter("https://buscarlivros?q=Python&page=1") == '{"docs": []}'
+    assert cache.estatisticas == {
+        "acertos": 1, "falhas": 0, "entradas": 1, "bytes": 12,
+    }
+
+
+def test_quando_entrada_expira_deve_ser_descartada(tmp_path):
+    cache = CacheEmDisco(tmp_path, ttl=10)
+    cache.guardar("https://buscarlivros?page=1", "conteudo")
+    with patch("colecao.cache.time.time", return_value=time.time() + 11):
+        assert cache.obter("https://buscarlivros?page=1") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_quando_passar_do_tamanho_maximo_deve_descartar_o_menos_usado(tmp_path):
+    cache = CacheEmDisco(tmp_path, tamanho_maximo=20)
+    cache.guardar("https://buscarlivros?page=1", "1" * 8)
+    cache.guardar("https://buscarlivros?page=2", "2" * 8)
+    cache.obter("https://buscarlivros?page=1")
+    cache.guardar("https://buscarlivros?page=3", "3" * 8)
+    assert cache.obter("https://buscarlivros?page=2") is None
+    assert cache.obter("https://buscarlivros?page=1") == "1" * 8
+    assert cache.obter("https://buscarlivros?page=3") == "3" * 8
+    assert cache.estatisticas["bytes"] == 16
+
+
+def test_quando_entrada_e_descartada_durante_a_leitura_deve_retornar_none(tmp_path):
+    cache = CacheEmDisco(tmp_path)
+    cache.guardar("https://buscarlivros?page=1", "conteudo")
+
+    def descartar_e_falhar(*args, **kwargs):
+        cache.limpar()
+        raise FileNotFoundError()
+
+    with patch("colecao.cache.open", side_effect=descartar_e_falhar, create=True):
+        assert cache.obter("https://buscarlivros?page=1") is None
+    assert cache.estatisticas["entradas"] == 0
+    assert cache.estatisticas["bytes"] == 0
+
+
+def test_quando_recriar_o_cache_deve_encontrar_as_entradas_gravadas(tmp_path):
+    CacheEmDisco(tmp_path).guardar("https://buscarlivros?page=1", "conteudo")
+    cache = CacheEmDisco(tmp_path)
+    assert cache.obter("https://buscarlivros?page=1") == "conteudo"
+
+
+@patch("colecao.livros.urlopen", return_value=StubHTTPResponse(b"conteudo"))
+def test_quando_executar_requisicao_com_cache_nao_deve_acessar_a_rede_de_novo(spy_urlopen, tmp_path):
+    cache = CacheEmDisco(tmp_path)
+    url = "https://buscarlivros?q=Python&page=1"
+    assert executar_requisicao(url, cache=cache) == "conteudo"
+    assert executar_requisicao(url, cache=cache) == "conteudo"
+    assert spy_urlopen.call_count == 1
+    assert spy_urlopen.call_args.args[0].full_url == url
+
+
+def test_quando_chave_repetida_deve_calcular_uma_vez():
+    memoria = CacheEmMemoria()
+    chamadas = []
+    calcular = lambda: chamadas.append(1) or "resultado"
+    assert memoria.obter("Agatha Christie", calcular) == "resultado"
+    assert memoria.obter("Agatha Christie", calcular) == "resultado"
+    assert len(chamadas) == 1
+    assert memoria.estatisticas["acertos"] == 1
+
+
+def test_quando_passar_da_capacidade_deve_descartar_a_menos_usada():
+    memoria = CacheEmMemoria(capacidade=2)
+    memoria.obter("a", lambda: "A")
+    memoria.obter("b", lambda: "B")
+    memoria.obter("a", lambda: "A")
+    memoria.obter("c", lambda: "C")
+    assert memoria.obter("b", lambda: "novo B") == "novo B"
+    assert memoria.estatisticas["descartadas"] == 2
+
+
+def test_quando_entrada_expira_deve_calcular_de_novo():
+    memoria = CacheEmMemoria(ttl=10)
+    memoria.obter("a", lambda: "antigo")
+    with patch("colecao.cache.time.monotonic", return_value=time.monotonic() + 11):
+        assert memoria.obter("a", lambda: "novo") == "novo"
+
+
+def test_quando_resultado_e_none_nao_deve_guardar():
+    memoria = CacheEmMemoria()
+    memoria.obter("a", lambda: None)
+    assert memoria.obter("a", lambda: "A") == "A"
+
+
+def test_quando_chamadas_simultaneas_devem_aguardar_um_unico_calculo():
+    memoria = CacheEmMemoria()
+    liberar = threading.Event()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait()
+        return "resultado"
+
+    resultados = []
+    threads = [
+        threading.Thread(
+            target=lambda: resultados.append(memoria.obter("a", calcular))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while memoria.estatisticas["agrupadas"] < 4:
+        time.sleep(0.001)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+    assert resultados == ["resultado"] * 5
+    assert len(chamadas) == 1
+
+
+@patch("colecao.livros.executar_requisicao", return_value="livros")
+def test_quando_consultar_livros_com_memoria_deve_requisitar_uma_vez(spy_executar_requisicao):
+    memoria = CacheEmMemoria()
+    assert consultar_livros("Agatha Christie", memoria=memoria) == "livros"
+    assert consultar_livros("Agatha Christie", memoria=memoria) == "livros"
+    spy_executar_requisicao.assert_called_once_with(
+        "https://buscador?autor=Agatha+Christie"
+    )
@@ -0,0 +1,94 @@
+import json
+import os
+import pytest
+from unittest.mock import patch
+from colecao.cli import main
+from colecao.livros import Resposta
+
+
+def pagina(num_docs, *autores):
+    return json.dumps({
+        "num_docs": num_docs,
+        "docs": [{"author": autor, "title": f"Livro de {autor}"} for autor in autores],
+    })
+
+
+@pytest.fixture
+def servico():
+    Resposta.quantidade_documentos_por_pagina = 2
+    paginas = {
+        "q=Python&page=1": pagina(4, "Luciano Ramalho", "Nilo Menezes"),
+        "q=Python&page=2": pagina(4, "Allen Downey", "Luciano Ramalho"),
+        "autor=Agatha&page=1": pagina(1, "Agatha Christie"),
+    }
+
+    def executar_requisicao(url, **opcoes):
+        return paginas[url.split("?")[1]]
+
+    with patch("colecao.lote.executar_requisicao", side_effect=executar_requisicao) as stub:
+        yield stub
+
+
+def test_quando_baixar_deve_gravar_uma_pasta_por_consulta(servico, tmp_path, capsys):
+    lote = tmp_path / "consultas.tsv"
+    lote.write_text("# autor\ttitulo\tlivre\nAgatha\t\t\n\t\tPython\n")
+    destino = tmp_path / "paginas"
+    assert main(["baixar", "--livre", "Python", "--lote", str(lote),
+                 "--destino", str(destino), "--compressao", "gzip"]) == 0
+    assert sorted(os.listdir(destino)) == ["autor=Agatha", "q=Python"]
+    assert sorted(os.listdir(destino / "q=Python")) == [
+        "pagina00001.json.gz", "pagina00002.json.gz",
+    ]
+    assert servico.call_count == 3
+    assert "3 paginas em" in capsys.readouterr().err
+
+
+def test_quando_gravacao_falha_deve_sair_com_erro(servico, tmp_path, capsys):
+    destino = tmp_path / "paginas"
+    with patch("colecao.escrita.gravar_conteudo", side_effect=OSError()):
+        assert main(["baixar", "--livre", "Python", "--destino", str(destino)]) == 1
+    assert "0 falhas, 2 erros de gravacao" in capsys.readouterr().err
+
+
+def test_quando_registrar_e_consultar_deve_usar_o_indice_local(servico, tmp_path, capsys):
+    destino = str(tmp_path / "segmentos")
+    indice = str(tmp_path / "livros.db")
+    main(["baixar", "--livre", "Python", "--destino", destino,
+          "--layout", "segmentos", "--silencioso"])
+    assert main(["registrar", destino, "--indice", indice, "--deduplicar", "exato"]) == 0
+    assert "3 documentos em" in capsys.readouterr().err
+    assert main(["consultar", "--indice", indice, "--autor", "ramalho"]) == 0
+    assert [json.loads(linha) for linha in capsys.readouterr().out.splitlines()] == [
+        {"author": "Luciano Ramalho", "title": "Livro de Luciano Ramalho"},
+    ]
+    assert main(["consultar", "--indice", indice, "--autor", "Christie"]) == 1
+
+
+def test_quando_registrar_sem_indice_deve_escrever_json_lines(servico, tmp_path, capsys):
+    destino = str(tmp_path / "paginas")
+    main(["baixar", "--livre", "Python", "--destino", destino, "--silencioso"])
+    main(["registrar", destino, "--silencioso"])
+    autores = [json.loads(linha)["author"] for linha in capsys.readouterr().out.splitlines()]
+    assert autores == ["Luciano Ramalho", "Nilo Menezes", "Allen Downey", "Luciano Ramalho"]
+
+
+def test_quando_baixar_sem_consulta_deve_sair_com_erro(tmp_path):
+    with pytest.raises(SystemExit):
+        main(["baixar", "--destino", str(tmp_path)])
+
+
+@patch("colecao.livros.executar_requisicao", return_value='{"num_docs": 0}')
+def test_quando_consultar_sem_indice_deve_consultar_o_servico(stub_executar_requisicao, capsys):
+    assert main(["consultar", "--autor", "Agatha Christie"]) == 0
+    assert capsys.readouterr().out == '{"num_docs": 0}\n'
+    stub_executar_requisicao.assert_called_once_with(
+        "https://buscador?autor=Agatha+Christie"
+    )
+
+
+@patch("colecao.livros.executar_requisicao", return_value='{"num_docs": 0}')
+def test_quando_consultar_sem_compressao_nao_deve_aceitar_compressao(stub_executar_requisicao):
+    main(["consultar", "--autor", "Agatha Christie", "--sem-compressao"])
+    stub_executar_requisicao.assert_called_once_with(
+        "https://buscador?autor=Agatha+Christie", aceitar_compressao=False
+    )
@@ -0,0 +1,200 @@
+import pytest
+from http.client import HTTPMessage, RemoteDisconnected
+from unittest.mock import patch
+from urllib.error import HTTPError, URLError
+from colecao.conexoes import PoolDeConexoes
+from colecao.livros import executar_requisicao, baixar_livros, Resposta
+from colecao.resiliencia import PoliticaDeRetentativa
+from test_livros import StubHTTPResponse
+
+
+class StubRespostaDaConexao(StubHTTPResponse):
+    def __init__(self, corpo=b"", status=200, will_close=False):
+        super().__init__(corpo)
+        self.headers = HTTPMessage()
+        self.status = status
+        self.reason = "OK" if status == 200 else "Erro"
+        self.will_close = will_close
+
+
+class FakeConexao:
+    instancias = []
+
+    def __init__(self, host, porta, timeout):
+        self.host = host
+        self.porta = porta
+        self.timeout = timeout
+        self.caminhos = []
+        self.fechada = False
+        self.respostas = []
+        FakeConexao.instancias.append(self)
+
+    def request(self, metodo, caminho, headers):
+        if self.respostas and isinstance(self.respostas[0], Exception):
+            raise self.respostas.pop(0)
+        self.caminhos.append(caminho)
+
+    def getresponse(self):
+        if self.respostas:
+            return self.respostas.pop(0)
+        return StubRespostaDaConexao(self.caminhos[-1].encode())
+
+    def close(self):
+        self.fechada = True
+
+
+@pytest.fixture
+def fake_conexao():
+    FakeConexao.instancias = []
+    with patch("colecao.conexoes.HTTPSConnection", FakeConexao):
+        with patch("colecao.conexoes.HTTPConnection", FakeConexao):
+            yield FakeConexao
+
+
+def test_quando_abrir_duas_vezes_o_mesmo_host_deve_reaproveitar_a_conexao(fake_conexao):
+    pool = PoolDeConexoes()
+    with pool.abrir("https://buscarlivros?q=Python&page=1") as resposta:
+        assert resposta.read() == b"/?q=Python&page=1"
+    with pool.abrir("https://buscarlivros?q=Python&page=2") as resposta:
+        assert resposta.read() == b"/?q=Python&page=2"
+    assert len(fake_conexao.instancias) == 1
+    assert fake_conexao.instancias[0].host == "buscarlivros"
+    assert pool.conexoes_abertas == 1
+
+
+def test_quando_hosts_diferentes_deve_abrir_uma_conexao_por_host(fake_conexao):
+    pool = PoolDeConexoes()
+    pool.abrir("https://buscarlivros?q=Python")
+    pool.abrir("https://buscador?autor=Python")
+    assert [c.host for c in fake_conexao.instancias] == ["buscarlivros", "buscador"]
+
+
+def test_quando_servidor_fecha_conexao_ociosa_deve_reconectar(fake_conexao):
+    pool = PoolDeConexoes()
+    pool.abrir("https://buscarlivros?page=1")
+    primeira = fake_conexao.instancias[0]
+    primeira.respostas.append(RemoteDisconnected("fechada"))
+    with pool.abrir("https://buscarlivros?page=2") as resposta:
+        assert resposta.read() == b"/?page=2"
+    assert len(fake_conexao.instancias) == 2
+    assert primeira.fechada
+    assert pool.conexoes_abertas == 1
+
+
+def test_quando_conexao_fica_ociosa_demais_deve_ser_descartada(fake_conexao):
+    pool = PoolDeConexoes(ociosidade_maxima=0)
+    pool.abrir("https://buscarlivros?page=1")
+    pool.abrir("https://buscarlivros?page=2")
+    assert len(fake_conexao.instancias) == 2
+    assert fake_conexao.instancias[0].fechada
+
+
+def test_quando_resposta_pede_para_fechar_nao_deve_reaproveitar(fake_conexao):
+    pool = PoolDeConexoes()
+    pool.abrir("https://buscarlivros")
+    fake_conexao.instancias[0].respostas.append(
+        StubRespostaDaConexao(b"", will_close=True)
+    )
+    pool.abrir("https://buscarlivros")
+    pool.abrir("https://buscarlivros")
+    assert len(fake_conexao.instancias) == 2
+    assert fake_conexao.instancias[0].fechada
+
+
+def test_quando_status_de_erro_deve_levantar_http_error(fake_conexao):
+    pool = PoolDeConexoes()
+    pool.abrir("https://buscarlivros")
+    fake_conexao.instancias[0].respostas.append(StubRespostaDaConexao(b"", 404))
+    with pytest.raises(HTTPError) as excecao:
+        pool.abrir("https://buscarlivros")
+    assert excecao.value.code == 404
+    assert pool.conexoes_abertas == 1
+
+
+def redirecionamento(destino, status=302):
+    resposta = StubRespostaDaConexao(b"", status)
+    resposta.headers["Location"] = destino
+    return resposta
+
+
+def test_quando_servidor_redireciona_deve_seguir_como_urlopen(fake_conexao):
+    pool = PoolDeConexoes()
+    pool.abrir("https://buscarlivros")
+    fake_conexao.instancias[0].respostas.extend([
+        redirecionamento("/v2?page=1", 301),
+        redirecionamento("https://buscador/v3?page=1"),
+    ])
+    with pool.abrir("https://buscarlivros/v1?page=1") as resposta:
+        assert resposta.read() == b"/v3?page=1"
+        assert resposta.url == "https://buscador/v3?page=1"
+    assert fake_conexao.instancias[0].caminhos[1:] == ["/v1?page=1", "/v2?page=1"]
+    assert fake_conexao.instancias[1].host == "buscador"
+
+
+def test_quando_redirecionamentos_nao_terminam_deve_levantar_http_error(fake_conexao):
+    pool = PoolDeConexoes()
+    pool.abrir("https://buscarlivros")
+    fake_conexao.instancias[0].respostas.extend(
+        redirecionamento("/loop") for _ in range(11)
+    )
+    with pytest.raises(HTTPError) as excecao:
+        pool.abrir("https://buscarlivros/loop")
+    assert excecao.value.code == 302
+
+
+def test_quando_executar_requisicao_com_pool_deve_logar_http_error(fake_conexao, caplog):
+    pool = PoolDeConexoes()
+    pool.abrir("https://buscador")
+    fake_conexao.instancias[0].respostas.append(StubRespostaDaConexao(b"", 500))
+    resultado = executar_requisicao("https://buscador", pool=pool)
+    assert resultado is None
+    assert len(caplog.records) == 1
+
+
+def test_quando_baixar_livros_com_pool_deve_usar_uma_conexao(fake_conexao):
+    paginas = [
+        b'{"num_docs": 4, "docs": [{"author": "A"}, {"author": "B"}]}',
+        b'{"num_docs": 4, "docs": [{"author": "C"}, {"author": "D"}]}',
+    ]
+
+    def getresponse(conexao=None):
+        return StubRespostaDaConexao(paginas.pop(0))
+
+    Resposta.quantidade_documentos_por_pagina = 2
+    with patch.object(FakeConexao, "getresponse", getresponse):
+        with patch("colecao.livros.escrever_em_arquivo") as mock_escrever:
+            with PoolDeConexoes() as pool:
+                baixar_livros(["/tmp/a1", "/tmp/a2"], None, None, "Python", pool=pool)
+    assert mock_escrever.call_count == 2
+    assert len(fake_conexao.instancias) == 1
+    assert fake_conexao.instancias[0].caminhos == [
+        "/?q=Python&page=1",
+        "/?q=Python&page=2",
+    ]
+
+
+def test_quando_nao_conseguir_conectar_deve_levantar_url_error(fake_conexao):
+    pool = PoolDeConexoes()
+    with patch.object(FakeConexao, "request", side_effect=ConnectionRefusedError()):
+        with pytest.raises(URLError) as erro:
+            pool.abrir("http://127.0.0.1:1/x")
+    assert isinstance(erro.value.reason, ConnectionRefusedError)
+    assert pool.conexoes_abertas == 0
+
+
+@patch("colecao.livros.time.sleep")
+def test_quando_executar_requisicao_com_pool_e_politica_deve_repetir_falha_de_conexao(spy_sleep, fake_conexao, caplog):
+    with patch.object(FakeConexao, "request", side_effect=ConnectionRefusedError()):
+        resultado = executar_requisicao("http://127.0.0.1:1/x", pool=PoolDeConexoes(),
+                                        politica=PoliticaDeRetentativa(3))
+    assert resultado is None
+    assert spy_sleep.call_count == 2
+    assert len(caplog.records) == 1
+
+
+def test_quando_abrir_com_timeout_deve_usar_na_conexao(fake_conexao):
+    pool = PoolDeConexoes(timeout=10)
+    pool.abrir("https://buscarlivros?page=1")
+    assert fake_conexao.instancias[0].timeout == 10
+    pool.abrir("https://buscarlivros?page=2", timeout=3)
+    assert fake_conexao.instancias[0].timeout == 3
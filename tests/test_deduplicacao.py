@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import patch
+from colecao.deduplicacao import (ConjuntoDeImpressoes,
+                                  Deduplicador,
+                                  FiltroDeBloom,
+                                  impressao_digital,
+                                  )
+from colecao.livros import registrar_livros, Livro
+
+
+@pytest.fixture
+def paginas_sobrepostas():
+    return [
+        '{"num_docs": 5, "docs": [{"author": "A", "title": "1"}, {"author": "B", "title": "2"}]}',
+        '{"num_docs": 5, "docs": [{"title": "2", "author": "B"}, {"author": "C", "title": "3"}]}',
+        '{"num_docs": 5, "docs": [{"author": "A", "title": "1"}, {"author": "D", "title": "4"}]}',
+    ]
+
+
+def inserir_registros(documentos):
+    return len(list(documentos))
+
+
+def test_quando_documentos_tem_as_mesmas_chaves_em_outra_ordem_impressao_deve_ser_igual():
+    assert impressao_digital({"author": "A", "title": "1"}) == impressao_digital({"title": "1", "author": "A"})
+    assert impressao_digital(Livro("A", "1")) == impressao_digital({"author": "A", "title": "1"})
+    assert impressao_digital({"author": "A", "title": "1"}) != impressao_digital({"author": "A", "title": "2"})
+
+
+def test_quando_instanciar_deduplicador_sem_lembrar_deve_levantar_type_error():
+    with pytest.raises(TypeError):
+        Deduplicador()
+
+
+@pytest.mark.parametrize("deduplicador", [ConjuntoDeImpressoes, FiltroDeBloom])
+@pytest.mark.parametrize("opcoes", [{}, {"em_fluxo": True}, {"tamanho_do_lote": 2}])
+@patch("colecao.livros.ler_arquivo")
+def test_quando_registrar_livros_com_deduplicador_deve_inserir_so_documentos_unicos(stub_ler_arquivo, opcoes, deduplicador, paginas_sobrepostas):
+    stub_ler_arquivo.side_effect = paginas_sobrepostas
+    deduplicador = deduplicador()
+    quantidade = registrar_livros(["1.json", "2.json", "3.json"], inserir_registros,
+                                  deduplicador=deduplicador, **opcoes)
+    assert quantidade == 4
+    assert deduplicador.descartados == 2
+    assert len(deduplicador) == 4
+
+
+def test_quando_filtro_de_bloom_e_salvo_deve_lembrar_na_proxima_execucao(tmp_path):
+    caminho = str(tmp_path / "vistos.bloom")
+    with FiltroDeBloom(capacidade=1000, caminho=caminho) as filtro:
+        assert filtro.filtrar([{"author": "A"}, {"author": "B"}]) == [{"author": "A"}, {"author": "B"}]
+    filtro = FiltroDeBloom(capacidade=1000, caminho=caminho)
+    assert filtro.filtrar([{"author": "B"}, {"author": "C"}]) == [{"author": "C"}]
+    assert filtro.descartados == 1
+    assert len(filtro) == 3
+
+
+def test_quando_filtro_de_bloom_esta_truncado_deve_levantar_value_error(tmp_path):
+    caminho = str(tmp_path / "vistos.bloom")
+    FiltroDeBloom(capacidade=1000, caminho=caminho).salvar()
+    with open(caminho, "r+b") as fp:
+        fp.truncate(40)
+    with pytest.raises(ValueError):
+        FiltroDeBloom(caminho=caminho)
+
+
+def test_quando_filtro_de_bloom_tem_capacidade_taxa_de_falsos_positivos_deve_ser_baixa():
+    filtro = FiltroDeBloom(capacidade=10000, taxa_de_falsos_positivos=0.01)
+    filtro.filtrar({"id": i} for i in range(5000))
+    novos = filtro.filtrar({"id": i} for i in range(5000, 10000))
+    assert len(novos) > 5000 * 0.99
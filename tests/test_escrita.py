@@ -0,0 +1,123 @@
+import os
+import pytest
+from unittest.mock import patch
+from colecao.escrita import EscritorDeArquivos
+from colecao.livros import baixar_livros, gravar_conteudo, ler_arquivo, Resposta
+
+
+def test_quando_escrever_e_esvaziar_o_arquivo_deve_existir(tmp_path):
+    arquivo = tmp_path / "consulta" / "pagina1.json"
+    with EscritorDeArquivos() as escritor:
+        escritor.escrever(str(arquivo), "dados de livros")
+        escritor.esvaziar()
+        assert arquivo.read_text() == "dados de livros"
+        assert escritor.gravados == 1
+    assert os.listdir(tmp_path / "consulta") == ["pagina1.json"]
+
+
+def test_quando_escrever_no_mesmo_diretorio_deve_criar_o_diretorio_uma_vez(tmp_path):
+    diretorio = tmp_path / "consulta"
+    with patch("colecao.escrita.os.makedirs", wraps=os.makedirs) as spy_makedirs:
+        with EscritorDeArquivos() as escritor:
+            for i in range(3):
+                escritor.escrever(str(diretorio / f"pagina{i}.json"), "dados")
+    spy_makedirs.assert_called_once_with(str(diretorio), exist_ok=True)
+    assert sorted(os.listdir(diretorio)) == [
+        "pagina0.json", "pagina1.json", "pagina2.json",
+    ]
+
+
+@patch("colecao.escrita.gravar_conteudo", side_effect=OSError())
+def test_quando_nao_conseguir_gravar_deve_logar(stub_open, tmp_path, caplog):
+    arquivo = str(tmp_path / "pagina1.json")
+    with EscritorDeArquivos() as escritor:
+        escritor.escrever(arquivo, "dados")
+    assert escritor.erros == 1
+    assert caplog.records[0].message == f"Nao foi possivel criar arquivo {arquivo}."
+
+
+def test_quando_um_arquivo_falha_deve_continuar_gravando_os_seguintes(tmp_path, caplog):
+    def gravar_ou_falhar(arquivo, conteudo, compressao=None):
+        if "pagina1" in arquivo:
+            raise RuntimeError("falha inesperada")
+        gravar_conteudo(arquivo, conteudo, compressao)
+
+    with patch("colecao.escrita.gravar_conteudo", side_effect=gravar_ou_falhar):
+        with EscritorDeArquivos() as escritor:
+            escritor.escrever(str(tmp_path / "pagina1.json"), "dados 1")
+            escritor.escrever(str(tmp_path / "pagina2.json"), "dados 2")
+            escritor.esvaziar()
+            assert (escritor.gravados, escritor.erros) == (1, 1)
+            escritor.escrever(str(tmp_path / "pagina3.json"), "dados 3")
+    assert (tmp_path / "pagina3.json").read_text() == "dados 3"
+    assert not (tmp_path / "pagina1.json").exists()
+
+
+def test_quando_fsync_sempre_deve_sincronizar_cada_arquivo_e_o_diretorio(tmp_path):
+    with patch.object(EscritorDeArquivos, "_sincronizar") as spy_sincronizar:
+        with EscritorDeArquivos(fsync="sempre") as escritor:
+            escritor.escrever(str(tmp_path / "pagina1.json"), "dados")
+            escritor.escrever(str(tmp_path / "pagina2.json"), "dados")
+    assert [c.args[0] for c in spy_sincronizar.call_args_list] == [
+        str(tmp_path / "pagina1.json.tmp"), str(tmp_path),
+        str(tmp_path / "pagina2.json.tmp"), str(tmp_path),
+    ]
+
+
+def test_quando_fsync_esvaziar_deve_sincronizar_ao_esvaziar(tmp_path):
+    with patch.object(EscritorDeArquivos, "_sincronizar") as spy_sincronizar:
+        escritor = EscritorDeArquivos(fsync="esvaziar")
+        escritor.escrever(str(tmp_path / "pagina1.json"), "dados")
+        escritor.escrever(str(tmp_path / "pagina2.json"), "dados")
+        escritor.esvaziar()
+        assert [c.args[0] for c in spy_sincronizar.call_args_list] == [
+            str(tmp_path / "pagina1.json"), str(tmp_path / "pagina2.json"),
+            str(tmp_path),
+        ]
+        escritor.fechar()
+        assert spy_sincronizar.call_count == 3
+
+
+def test_quando_fsync_sempre_deve_chamar_fsync_no_arquivo_e_no_diretorio(tmp_path):
+    with patch("colecao.escrita.os.fsync") as spy_fsync:
+        with EscritorDeArquivos(fsync="sempre") as escritor:
+            escritor.escrever(str(tmp_path / "pagina1.json"), "dados")
+    assert spy_fsync.call_count == 2
+
+
+def test_quando_politica_de_fsync_invalida_deve_levantar_value_error():
+    with pytest.raises(ValueError):
+        EscritorDeArquivos(fsync="as vezes")
+
+
+def test_quando_escrever_depois_de_fechar_deve_levantar_value_error(tmp_path):
+    escritor = EscritorDeArquivos()
+    escritor.fechar()
+    with pytest.raises(ValueError):
+        escritor.escrever(str(tmp_path / "pagina1.json"), "dados")
+
+
+@patch("colecao.livros.executar_requisicao")
+def test_quando_baixar_livros_com_escritor_deve_gravar_todas_as_paginas(stub_executar_requisicao, tmp_path):
+    paginas = [
+        '{"num_docs": 4, "docs": [{"author": "A"}, {"author": "B"}]}',
+        '{"num_docs": 4, "docs": [{"author": "C"}, {"author": "D"}]}',
+    ]
+    stub_executar_requisicao.side_effect = paginas
+    Resposta.quantidade_documentos_por_pagina = 2
+    arquivo = [str(tmp_path / "pagina1.json"), str(tmp_path / "pagina2.json")]
+    with EscritorDeArquivos() as escritor:
+        baixar_livros(arquivo, None, None, "Python", escritor=escritor)
+        assert [open(a).read() for a in arquivo] == paginas
+
+
+def test_quando_compressao_invalida_deve_levantar_value_error_ao_criar():
+    with pytest.raises(ValueError):
+        EscritorDeArquivos(compressao="zip")
+
+
+def test_quando_escritor_com_compressao_ler_arquivo_deve_descomprimir(tmp_path):
+    arquivo = str(tmp_path / "pagina1.json")
+    with EscritorDeArquivos(compressao="lzma") as escritor:
+        escritor.escrever(arquivo, "dados de livros")
+    assert ler_arquivo(arquivo) == "dados de livros"
@@ -0,0 +1,81 @@
+import pytest
+import sqlite3
+from colecao.deduplicacao import impressao_digital
+from colecao.indice import IndiceDeLivros, normalizar_termos
+from colecao.livros import registrar_livros, escrever_em_arquivo, Livro
+
+
+@pytest.fixture
+def paginas():
+    return [
+        '{"num_docs": 4, "docs": ['
+        '{"author": "Machado de Assis", "title": "Dom Casmurro"},'
+        '{"author": "Jos\\u00e9 de Alencar", "title": "Iracema"}]}',
+        '{"num_docs": 4, "docs": ['
+        '{"author": "Machado de Assis", "title": "Mem\\u00f3rias P\\u00f3stumas de Br\\u00e1s Cubas"},'
+        '{"author": ["Agatha Christie"], "title": "Poirot Investigates", "year": 1924}]}',
+    ]
+
+
+@pytest.fixture
+def arquivos(tmp_path, paginas):
+    arquivos = [str(tmp_path / f"pagina{i}.json") for i in range(len(paginas))]
+    for arquivo, pagina in zip(arquivos, paginas):
+        escrever_em_arquivo(arquivo, pagina)
+    return arquivos
+
+
+def test_quando_normalizar_termos_deve_remover_acentos_e_maiusculas():
+    assert normalizar_termos("Memórias Póstumas, de BRÁS Cubas") == [
+        "memorias", "postumas", "de", "bras", "cubas",
+    ]
+    assert normalizar_termos(["Agatha Christie", None]) == ["agatha", "christie"]
+    assert normalizar_termos(None) == []
+
+
+def test_quando_registrar_livros_no_indice_deve_encontrar_por_autor_e_titulo(tmp_path, arquivos):
+    with IndiceDeLivros(str(tmp_path / "indice.db")) as indice:
+        assert registrar_livros(arquivos, indice.inserir_registros) == 4
+        assert [d["title"] for d in indice.buscar(autor="machado")] == [
+            "Dom Casmurro", "Memórias Póstumas de Brás Cubas",
+        ]
+        assert indice.buscar(titulo="postumas bras") == [
+            {"author": "Machado de Assis", "title": "Memórias Póstumas de Brás Cubas"},
+        ]
+        assert indice.buscar(autor="Christie", titulo="poirot") == [
+            {"author": ["Agatha Christie"], "title": "Poirot Investigates", "year": 1924},
+        ]
+        assert indice.buscar(autor="Machado", titulo="Iracema") == []
+        assert indice.buscar(autor="machado", limite=1) == [
+            {"author": "Machado de Assis", "title": "Dom Casmurro"},
+        ]
+        assert indice.buscar() == []
+
+
+def test_quando_registrar_a_mesma_pagina_de_novo_nao_deve_duplicar(tmp_path, arquivos):
+    caminho = str(tmp_path / "indice.db")
+    with IndiceDeLivros(caminho) as indice:
+        registrar_livros(arquivos[:1], indice.inserir_registros)
+    with IndiceDeLivros(caminho) as indice:
+        assert registrar_livros(arquivos, indice.inserir_registros, em_fluxo=True) == 2
+        assert len(indice) == 4
+        assert len(indice.buscar(autor="Alencar")) == 1
+
+
+def test_quando_inserir_livros_deve_indexar_como_documentos(tmp_path):
+    with IndiceDeLivros(str(tmp_path / "indice.db")) as indice:
+        indice.inserir_registros([Livro("Nilo Ney Coutinho Menezes", "Introducao a Programacao com Python")])
+        assert indice.buscar(titulo="python") == [
+            {"author": "Nilo Ney Coutinho Menezes", "title": "Introducao a Programacao com Python"},
+        ]
+
+
+def test_quando_inserir_documento_deve_usar_a_impressao_digital_do_deduplicador(tmp_path):
+    caminho = str(tmp_path / "indice.db")
+    documento = {"title": "Pense em Python", "author": "Allen B. Downey"}
+    with IndiceDeLivros(caminho) as indice:
+        indice.inserir_registros([documento])
+    with sqlite3.connect(caminho) as conexao:
+        assert conexao.execute("SELECT impressao FROM documentos").fetchall() == [
+            (impressao_digital(documento).hex(),),
+        ]
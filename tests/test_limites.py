@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from colecao.limites import (LimitadorDeTaxa,
+                             definir_limitador_global,
+                             limitador_global,
+                             )
+from colecao.livros import executar_requisicao
+from test_livros import StubHTTPResponse
+
+
+class FakeRelogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio():
+    relogio = FakeRelogio()
+    with patch("colecao.limites.time.monotonic", relogio.monotonic):
+        yield relogio
+
+
+@pytest.fixture
+def sem_limitador_global():
+    yield
+    definir_limitador_global(None)
+
+
+def test_quando_dentro_da_rajada_nao_deve_esperar(relogio):
+    limitador = LimitadorDeTaxa(taxa=2, rajada=3)
+    assert [limitador._reservar("https://buscador") for _ in range(3)] == [0, 0, 0]
+
+
+def test_quando_passar_da_rajada_deve_esperar_pela_taxa(relogio):
+    limitador = LimitadorDeTaxa(taxa=2, rajada=1)
+    esperas = [limitador._reservar("https://buscador") for _ in range(3)]
+    assert esperas == [0, 0.5, 1.0]
+    assert limitador.estatisticas == {
+        "requisicoes": 3, "esperas": 2, "tempo_esperado": 1.5,
+    }
+
+
+def test_quando_o_tempo_passa_as_fichas_devem_voltar(relogio):
+    limitador = LimitadorDeTaxa(taxa=2, rajada=2)
+    limitador._reservar("https://buscador")
+    limitador._reservar("https://buscador")
+    relogio.agora += 10
+    assert limitador._reservar("https://buscador") == 0
+    assert limitador._reservar("https://buscador") == 0
+    assert limitador._reservar("https://buscador") == 0.5
+
+
+def test_quando_hosts_diferentes_cada_um_tem_seu_balde(relogio):
+    limitador = LimitadorDeTaxa(taxa=1, por_host={"buscarlivros": (10, 1)})
+    assert limitador._reservar("https://buscador?autor=X") == 0
+    assert limitador._reservar("https://buscarlivros?q=X") == 0
+    assert limitador._reservar("https://buscador?autor=Y") == 1
+    assert limitador._reservar("https://buscarlivros?q=Y") == 0.1
+
+
+def test_quando_aguardar_deve_dormir_o_tempo_da_espera(relogio):
+    limitador = LimitadorDeTaxa(taxa=4)
+    with patch("colecao.limites.time.sleep") as spy_sleep:
+        limitador.aguardar("https://buscador")
+        limitador.aguardar("https://buscador")
+    spy_sleep.assert_called_once_with(0.25)
+
+
+def test_quando_aguardar_async_deve_dormir_sem_bloquear(relogio):
+    limitador = LimitadorDeTaxa(taxa=4)
+
+    async def aguardar_duas_vezes():
+        await limitador.aguardar_async("https://buscador")
+        return await limitador.aguardar_async("https://buscador")
+
+    with patch("colecao.limites.asyncio.sleep") as spy_sleep:
+        assert asyncio.run(aguardar_duas_vezes()) == 0.25
+    spy_sleep.assert_called_once_with(0.25)
+
+
+@patch("colecao.livros.urlopen", return_value=StubHTTPResponse())
+def test_quando_ha_limitador_global_executar_requisicao_deve_consulta_lo(stub_urlopen, sem_limitador_global):
+    limitador = LimitadorDeTaxa(taxa=1000, rajada=10)
+    definir_limitador_global(limitador)
+    assert limitador_global() is limitador
+    executar_requisicao("https://buscador")
+    executar_requisicao("https://buscador")
+    assert limitador.estatisticas["requisicoes"] == 2
@@ -1,4 +1,6 @@
 import pytest
+import mmap
+import tracemalloc
 from unittest import skip
 from unittest.mock import patch, mock_open, MagicMock, call 
 from colecao.livros import (consultar_livros,
@@ -8,14 +10,29 @@ from colecao.livros import (consultar_livros,
                             baixar_livros,
                             Resposta,
                             registrar_livros,
+                            Livro,
+                            agrupar_em_lotes,
+                            ler_arquivo,
                             )
 from urllib.request import HTTPError, URLError
+from email.message import Message
+import gzip
+import zlib
 
 
 
 class StubHTTPResponse:
-    def read(self):
-        return b''
+    def __init__(self, corpo=b'', **cabecalhos):
+        self._corpo = corpo
+        self.headers = Message()
+        for nome, valor in cabecalhos.items():
+            self.headers[nome.replace("_", "-")] = valor
+
+    def read(self, tamanho=-1):
+        if tamanho < 0:
+            tamanho = len(self._corpo)
+        bloco, self._corpo = self._corpo[:tamanho], self._corpo[tamanho:]
+        return bloco
 
     def __enter__(self):
         return self
@@ -725,3 +742,334 @@ def test_quando_registrar_livros_deve_inserir_8_registros_na_base_de_dados(stub_
             "title": "Python Fluent"}
 
 
+@patch ("colecao.livros.executar_requisicao")
+def test_quando_baixar_livros_em_paralelo_deve_escrever_cada_pagina_no_seu_arquivo(stub_executar_requisicao, resultado_em_tres_paginas):
+    paginas = {
+        "https://buscarlivros?q=Python&page=1": resultado_em_tres_paginas[0],
+        "https://buscarlivros?q=Python&page=2": resultado_em_tres_paginas[1],
+        "https://buscarlivros?q=Python&page=3": resultado_em_tres_paginas[2],
+    }
+    stub_executar_requisicao.side_effect = lambda url: paginas[url]
+    Resposta.quantidade_documentos_por_pagina = 3
+    arquivo = [
+        "/tmp/arquivo1",
+        "/tmp/arquivo2",
+        "/tmp/arquivo3"
+    ]
+    with patch("colecao.livros.escrever_em_arquivo") as mock_escrever:
+        baixar_livros(arquivo, None, None, "Python", trabalhadores=4)
+        assert sorted(mock_escrever.call_args_list) == [
+            call(arquivo[0], resultado_em_tres_paginas[0]),
+            call(arquivo[1], resultado_em_tres_paginas[1]),
+            call(arquivo[2], resultado_em_tres_paginas[2]),
+        ]
+
+
+@patch ("colecao.livros.executar_requisicao")
+def test_quando_baixar_livros_em_paralelo_deve_pular_pagina_com_erro(stub_executar_requisicao, resultado_em_tres_paginas_erro_na_pagina_2):
+    paginas = {
+        "https://buscarlivros?q=Python&page=1": resultado_em_tres_paginas_erro_na_pagina_2[0],
+        "https://buscarlivros?q=Python&page=2": resultado_em_tres_paginas_erro_na_pagina_2[1],
+        "https://buscarlivros?q=Python&page=3": resultado_em_tres_paginas_erro_na_pagina_2[2],
+    }
+    stub_executar_requisicao.side_effect = lambda url: paginas[url]
+    Resposta.quantidade_documentos_por_pagina = 3
+    arquivo = [
+        "/tmp/arquivo1",
+        "/tmp/arquivo2",
+        "/tmp/arquivo3"
+    ]
+    with patch("colecao.livros.escrever_em_arquivo") as mock_escrever:
+        baixar_livros(arquivo, None, None, "Python", trabalhadores=4)
+        assert sorted(mock_escrever.call_args_list) == [
+            call(arquivo[0], resultado_em_tres_paginas_erro_na_pagina_2[0]),
+            call(arquivo[2], resultado_em_tres_paginas_erro_na_pagina_2[2]),
+        ]
+
+
+def test_quando_iterar_documentos_deve_gerar_os_mesmos_documentos(resultado_em_tres_paginas):
+    resposta = Resposta(resultado_em_tres_paginas[2])
+    assert list(resposta.iter_documentos()) == Resposta(resultado_em_tres_paginas[2]).documentos
+    assert resposta.quantidade_de_documentos == 8
+    assert resposta._dados is None
+
+
+def test_quando_iterar_documentos_deve_ler_num_docs_depois_de_docs():
+    resposta = Resposta('{"docs": [{"author": "Nilo Neil"}, {}], "num_docs": 2}')
+    assert resposta.quantidade_de_documentos == 2
+    assert list(resposta.iter_documentos()) == [{"author": "Nilo Neil"}, {}]
+
+
+def test_quando_iterar_documentos_com_json_invalido_deve_logar(caplog):
+    resposta = Resposta('{"num_docs": 2, "docs": [{"author": "Nilo Neil"} {}]}')
+    assert list(resposta.iter_documentos()) == [{"author": "Nilo Neil"}]
+    assert len(caplog.records) == 1
+    assert "JSON invalido" in caplog.records[0].message
+
+
+@pytest.mark.parametrize("docs", ["null", '{"author": "Nilo Neil"}', '"Nilo Neil"'])
+def test_quando_iterar_documentos_e_docs_nao_e_array_deve_logar(docs, caplog):
+    resposta = Resposta(f'{{"num_docs": 1, "docs": {docs}}}')
+    assert list(resposta.iter_documentos()) == []
+    assert len(caplog.records) == 1
+    assert "tipo invalido" in caplog.records[0].message
+
+
+@patch("colecao.livros.ler_arquivo")
+def test_quando_registrar_livros_em_fluxo_deve_inserir_8_registros(stub_ler_arquivo, resultado_em_tres_paginas):
+    arquivos = [
+            "/tmp/arquivo1",
+            "/tmp/arquivo2",
+            "/tmp/arquivo3",
+            ]
+    stub_ler_arquivo.side_effect = resultado_em_tres_paginas
+    fake_db = FakeDb()
+    quantidade = registrar_livros(
+        arquivos,
+        lambda documentos: fake_db.inserir_registros(list(documentos)),
+        em_fluxo=True,
+    )
+    assert quantidade == 8
+    assert fake_db._registros[0] == {
+            "author": "Luciano Ramalho",
+            "title": "Python Fluent"}
+
+
+def test_quando_converter_livro_para_dict_deve_ser_igual_ao_documento(resultado_em_tres_paginas):
+    resposta = Resposta(resultado_em_tres_paginas[0])
+    assert [livro.para_dict() for livro in resposta.livros] == resposta.documentos
+    assert [livro.para_dict() for livro in resposta.iter_livros()] == resposta.documentos
+
+
+def test_quando_documento_tem_outras_chaves_livro_deve_preserva_las():
+    documento = {"title": "Pense em Python", "year": 2016}
+    livro = Livro.de_documento(documento)
+    assert livro.para_dict() == documento
+    assert livro.outros == {"year": 2016}
+
+
+def test_quando_livros_iguais_devem_ser_um_so_num_conjunto():
+    documentos = [
+        {"author": "Luciano Ramalho", "title": "Python Fluente", "tags": ["python"]},
+        {"author": "Luciano Ramalho", "title": "Python Fluente", "tags": ["python"]},
+        {"author": "Luciano Ramalho", "title": "Python Fluente", "tags": ["fluente"]},
+    ]
+    livros = {Livro.de_documento(documento) for documento in documentos}
+    assert sorted(livro.para_dict()["tags"] for livro in livros) == [["fluente"], ["python"]]
+
+
+def test_quando_livro_tem_varios_autores_deve_ser_hashable():
+    documento = {"author": ["Allen B. Downey", {"nome": "Chris Mayfield"}], "title": "Think Java"}
+    livros = {Livro.de_documento(documento), Livro.de_documento(dict(documento))}
+    assert len(livros) == 1
+
+
+def test_quando_autores_se_repetem_em_paginas_diferentes_devem_compartilhar_a_string(resultado_em_tres_paginas):
+    primeira = Resposta(resultado_em_tres_paginas[0]).livros
+    segunda = Resposta(resultado_em_tres_paginas[1]).livros
+    assert primeira[0].author is segunda[0].author
+
+
+def test_quando_guardar_livros_deve_ocupar_menos_memoria_que_dicts():
+    documentos = [
+        {"author": "Luciano Ramalho", "title": f"Python Fluent {i}"}
+        for i in range(1000)
+    ]
+    tracemalloc.start()
+    try:
+        copias = [dict(documento) for documento in documentos]
+        memoria_dicts = tracemalloc.get_traced_memory()[0]
+        del copias
+        tracemalloc.reset_peak()
+        inicio = tracemalloc.get_traced_memory()[0]
+        livros = [Livro.de_documento(documento) for documento in documentos]
+        memoria_livros = tracemalloc.get_traced_memory()[0] - inicio
+    finally:
+        tracemalloc.stop()
+    assert memoria_livros < memoria_dicts / 2
+
+
+@patch("colecao.livros.ler_arquivo")
+def test_quando_registrar_livros_em_lotes_deve_juntar_documentos_de_varios_arquivos(stub_ler_arquivo, conteudo_de_quatro_arquivos):
+    arquivos = [
+            "/tmp/arquivo1",
+            "/tmp/arquivo2",
+            "/tmp/arquivo3",
+            "/tmp/arquivo4",
+            ]
+    stub_ler_arquivo.side_effect = conteudo_de_quatro_arquivos
+    spy_inserir_registros = MagicMock(side_effect=fake_inserir_registros)
+    quantidade = registrar_livros(arquivos, spy_inserir_registros, tamanho_do_lote=8)
+    assert quantidade == 17
+    assert [len(c.args[0]) for c in spy_inserir_registros.call_args_list] == [8, 8, 1]
+
+
+def test_quando_agrupar_em_lotes_por_bytes_nao_deve_passar_do_limite():
+    documentos = [{"title": "x" * 10}] * 5
+    tamanho = len('{"title": "xxxxxxxxxx"}')
+    lotes = list(agrupar_em_lotes(documentos, bytes_por_lote=tamanho * 2))
+    assert [len(lote) for lote in lotes] == [2, 2, 1]
+
+
+def test_quando_agrupar_em_lotes_documento_maior_que_o_limite_fica_sozinho():
+    documentos = [{"title": "x"}, {"title": "x" * 100}, {"title": "x"}]
+    lotes = list(agrupar_em_lotes(documentos, tamanho_do_lote=10, bytes_por_lote=50))
+    assert [len(lote) for lote in lotes] == [1, 1, 1]
+
+
+@patch("colecao.livros.ler_arquivo")
+def test_quando_registrar_livros_em_paralelo_deve_inserir_na_ordem_dos_arquivos(stub_ler_arquivo, conteudo_de_quatro_arquivos):
+    arquivos = [f"/tmp/arquivo{i}" for i in range(1, 5)]
+    conteudos = dict(zip(arquivos, conteudo_de_quatro_arquivos))
+    stub_ler_arquivo.side_effect = lambda arquivo: conteudos[arquivo]
+    fake_db = FakeDb()
+    quantidade = registrar_livros(
+        arquivos, fake_db.inserir_registros, trabalhadores=3, usar_threads=True
+    )
+    assert quantidade == 17
+    assert fake_db._registros[-2:] == [
+        {"author": "Kenneth Reitz", "title": "O Guia do Mochileiro Python"},
+        {"author": "Wes McKinney", "title": "Python Para Abakuse de Dados"},
+    ]
+
+
+def test_quando_ler_arquivo_deve_retornar_o_conteudo(tmp_path):
+    arquivo = tmp_path / "pagina.json"
+    arquivo.write_text('{"docs": [{"author": "João"}]}', encoding="utf-8")
+    assert ler_arquivo(str(arquivo)) == '{"docs": [{"author": "João"}]}'
+
+
+@patch("colecao.livros.LIMIAR_MMAP", 0)
+def test_quando_ler_arquivo_grande_deve_usar_mmap(tmp_path):
+    arquivo = tmp_path / "pagina.json"
+    arquivo.write_text('{"docs": [{"author": "João"}]}', encoding="utf-8")
+    with patch("colecao.livros.mmap.mmap", wraps=mmap.mmap) as spy_mmap:
+        assert ler_arquivo(str(arquivo)) == '{"docs": [{"author": "João"}]}'
+        assert spy_mmap.call_count == 1
+
+
+def test_quando_ler_arquivo_com_codificacao_errada_deve_logar(tmp_path, caplog):
+    arquivo = tmp_path / "pagina.json"
+    arquivo.write_bytes('{"author": "João"}'.encode("latin-1"))
+    assert ler_arquivo(str(arquivo)) == ""
+    assert len(caplog.records) == 1
+    assert "byte 0xe3 na posicao 14" in caplog.records[0].message
+
+
+def test_quando_ler_arquivo_inexistente_deve_logar(tmp_path, caplog):
+    arquivo = str(tmp_path / "nao_existe.json")
+    assert ler_arquivo(arquivo) == ""
+    assert caplog.records[0].message == f"Nao foi possivel ler o arquivo {arquivo}."
+
+
+def test_quando_registrar_livros_com_processos_deve_inserir_todos_os_registros(tmp_path, conteudo_de_quatro_arquivos):
+    arquivos = []
+    for i, conteudo in enumerate(conteudo_de_quatro_arquivos):
+        arquivo = tmp_path / f"pagina{i}.json"
+        arquivo.write_text(conteudo)
+        arquivos.append(str(arquivo))
+    fake_db = FakeDb()
+    quantidade = registrar_livros(arquivos, fake_db.inserir_registros, trabalhadores=2)
+    assert quantidade == 17
+    assert fake_db._registros[-1] == {
+        "author": "Wes McKinney", "title": "Python Para Abakuse de Dados",
+    }
+
+
+def test_quando_diretorio_ja_existe_escrever_em_arquivo_nao_deve_logar(tmp_path, caplog):
+    escrever_em_arquivo(str(tmp_path / "arquivo.json"), "dados de livros")
+    assert caplog.records == []
+    assert (tmp_path / "arquivo.json").read_text() == "dados de livros"
+
+
+@pytest.mark.parametrize("nome, compressao", [
+    ("pagina.json", None),
+    ("pagina.json.gz", None),
+    ("pagina.json.xz", None),
+    ("pagina.json", "gzip"),
+    ("pagina.json", "lzma"),
+])
+def test_quando_escrever_comprimido_ler_arquivo_deve_descomprimir(tmp_path, nome, compressao, resultado_em_tres_paginas):
+    arquivo = str(tmp_path / nome)
+    escrever_em_arquivo(arquivo, resultado_em_tres_paginas[0], compressao=compressao)
+    assert ler_arquivo(arquivo) == resultado_em_tres_paginas[0]
+
+
+def test_quando_escrever_com_extensao_gz_deve_gravar_gzip(tmp_path):
+    arquivo = tmp_path / "pagina.json.gz"
+    escrever_em_arquivo(str(arquivo), "dados de livros")
+    assert arquivo.read_bytes()[:2] == b"\x1f\x8b"
+
+
+def test_quando_compressao_invalida_deve_levantar_value_error(tmp_path):
+    with pytest.raises(ValueError):
+        escrever_em_arquivo(str(tmp_path / "pagina.json"), "dados", compressao="zip")
+
+
+def test_quando_arquivo_comprimido_esta_truncado_deve_logar(tmp_path, caplog):
+    arquivo = tmp_path / "pagina.json.gz"
+    escrever_em_arquivo(str(arquivo), "dados de livros" * 100)
+    arquivo.write_bytes(arquivo.read_bytes()[:20])
+    assert ler_arquivo(str(arquivo)) == ""
+    assert len(caplog.records) == 1
+
+
+@patch("colecao.livros.urlopen")
+def test_quando_executar_requisicao_deve_enviar_accept_encoding(spy_urlopen):
+    spy_urlopen.return_value = StubHTTPResponse(b"dados")
+    executar_requisicao("https://buscarlivros?page=1")
+    pedido = spy_urlopen.call_args.args[0]
+    assert pedido.get_header("Accept-encoding") == "gzip, deflate"
+
+
+@patch("colecao.livros.urlopen")
+def test_quando_nao_aceitar_compressao_nao_deve_enviar_accept_encoding(spy_urlopen):
+    spy_urlopen.return_value = StubHTTPResponse(b"dados")
+    executar_requisicao("https://buscarlivros?page=1", aceitar_compressao=False)
+    spy_urlopen.assert_called_once_with("https://buscarlivros?page=1", timeout=10)
+
+
+@pytest.mark.parametrize("codificacao, comprimir", [
+    ("gzip", gzip.compress),
+    ("deflate", zlib.compress),
+    ("deflate", lambda dados: zlib.compress(dados)[2:-4]),
+])
+def test_quando_resposta_comprimida_deve_descomprimir_em_blocos(codificacao, comprimir, resultado_em_tres_paginas):
+    corpo = comprimir(resultado_em_tres_paginas[0].encode() * 2000)
+    resposta = StubHTTPResponse(corpo, Content_Encoding=codificacao)
+    with patch("colecao.livros.urlopen", return_value=resposta):
+        with patch("colecao.livros.TAMANHO_DO_BLOCO", 1024):
+            resultado = executar_requisicao("https://buscarlivros?page=1", aceitar_compressao=True)
+    assert resultado == resultado_em_tres_paginas[0] * 2000
+
+
+def test_quando_resposta_informa_charset_deve_decodificar_com_ele():
+    resposta = StubHTTPResponse(
+        "Memorias Postumas de Brás Cubas".encode("latin-1"),
+        Content_Type="application/json; charset=ISO-8859-1",
+    )
+    with patch("colecao.livros.urlopen", return_value=resposta):
+        resultado = executar_requisicao("https://buscarlivros?page=1")
+    assert resultado == "Memorias Postumas de Brás Cubas"
+
+
+def test_quando_resposta_comprimida_invalida_deve_logar(caplog):
+    resposta = StubHTTPResponse(b"nao e gzip", Content_Encoding="gzip")
+    with patch("colecao.livros.urlopen", return_value=resposta):
+        assert executar_requisicao("https://buscarlivros?page=1") is None
+    assert caplog.records[0].message.startswith(
+        "Resposta comprimida invalida em https://buscarlivros?page=1"
+    )
+
+
+def test_quando_manter_comprimido_deve_gravar_os_bytes_recebidos(tmp_path, resultado_em_tres_paginas):
+    corpo = gzip.compress(resultado_em_tres_paginas[0].encode())
+    resposta = StubHTTPResponse(corpo, Content_Encoding="gzip")
+    with patch("colecao.livros.urlopen", return_value=resposta):
+        resultado = executar_requisicao(
+            "https://buscarlivros?page=1", aceitar_compressao=True, manter_comprimido=True
+        )
+    arquivo = tmp_path / "pagina1.json.gz"
+    escrever_em_arquivo(str(arquivo), resultado)
+    assert arquivo.read_bytes() == corpo
+    assert ler_arquivo(str(arquivo)) == resultado_em_tres_paginas[0]
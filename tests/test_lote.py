@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import patch
+from colecao.lote import baixar_lote, deduplicar
+from colecao.livros import Resposta
+from colecao.segmentos import ArmazemDeSegmentos
+
+
+def pagina(num_docs):
+    return f'{{"num_docs": {num_docs}, "docs": [{{"author": "A"}}, {{"author": "B"}}]}}'
+
+
+@pytest.fixture
+def documentos_por_consulta():
+    Resposta.quantidade_documentos_por_pagina = 2
+    return {"q=Grande": 8, "q=Pequena": 2, "autor=Nilo": 4}
+
+
+def stub_servidor(documentos_por_consulta, chamadas):
+    def executar_requisicao(url, **opcoes):
+        chamadas.append(url)
+        consulta = url.split("?")[1].split("&page=")[0]
+        return pagina(documentos_por_consulta[consulta])
+    return executar_requisicao
+
+
+def test_quando_especificacoes_se_repetem_deve_deduplicar():
+    consultas = deduplicar([
+        (None, None, "Python"),
+        (None, None, "  Python "),
+        ("Nilo", None, None),
+        ("Nilo", "", None),
+        ("Nilo", None, "Python"),
+    ])
+    assert [consulta.chave for consulta in consultas] == ["q=Python", "autor=Nilo"]
+
+
+def test_quando_baixar_lote_deve_baixar_cada_pagina_uma_vez(documentos_por_consulta, tmp_path):
+    chamadas = []
+    especificacoes = [(None, None, "Grande"), (None, None, "Pequena"),
+                      (None, None, "Grande"), ("Nilo", None, None)]
+    with patch("colecao.lote.executar_requisicao",
+               side_effect=stub_servidor(documentos_por_consulta, chamadas)):
+        with ArmazemDeSegmentos(tmp_path) as armazem:
+            andamento = baixar_lote(especificacoes, armazem=armazem, trabalhadores=3)
+            assert sorted(armazem.paginas()) == sorted(
+                [("q=Grande", p) for p in range(1, 5)]
+                + [("q=Pequena", 1), ("autor=Nilo", 1), ("autor=Nilo", 2)]
+            )
+    assert len(chamadas) == len(set(chamadas)) == 7
+    assert all(estado.concluida for estado in andamento.values())
+    assert andamento["q=Grande"].total_de_paginas == 4
+
+
+def test_quando_baixar_lote_consulta_pequena_nao_espera_a_grande(documentos_por_consulta, tmp_path):
+    chamadas = []
+    especificacoes = [(None, None, "Grande"), ("Nilo", None, None)]
+    with patch("colecao.lote.executar_requisicao",
+               side_effect=stub_servidor(documentos_por_consulta, chamadas)):
+        baixar_lote(especificacoes, trabalhadores=1,
+                    arquivo=lambda chave, pagina: str(tmp_path / chave / f"{pagina}.json"))
+    assert chamadas == [
+        "https://buscarlivros?q=Grande&page=1",
+        "https://buscarlivros?autor=Nilo&page=1",
+        "https://buscarlivros?q=Grande&page=2",
+        "https://buscarlivros?autor=Nilo&page=2",
+        "https://buscarlivros?q=Grande&page=3",
+        "https://buscarlivros?q=Grande&page=4",
+    ]
+    assert (tmp_path / "autor=Nilo" / "2.json").read_text() == pagina(4)
+
+
+@patch("colecao.lote.executar_requisicao")
+def test_quando_primeira_pagina_falha_deve_tentar_a_segunda(stub_executar_requisicao, tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    stub_executar_requisicao.side_effect = [None, pagina(6), pagina(6)]
+    progressos = []
+    andamento = baixar_lote(
+        [(None, None, "Python")], trabalhadores=1,
+        arquivo=lambda chave, pagina: str(tmp_path / f"{pagina}.json"),
+        progresso=lambda estado: progressos.append(
+            (estado.baixadas, estado.falhas, estado.concluida)
+        ),
+    )
+    assert progressos == [(0, 1, False), (1, 1, False), (2, 1, True)]
+    assert andamento["q=Python"].total_de_paginas == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2.json", "3.json"]
+
+
+def test_quando_nao_informar_destino_deve_levantar_value_error():
+    with pytest.raises(ValueError):
+        baixar_lote([(None, None, "Python")])
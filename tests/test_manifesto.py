@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import patch, call
+from colecao.manifesto import Manifesto
+from colecao.livros import baixar_livros, Resposta
+
+
+@pytest.fixture
+def paginas():
+    return [
+        '{"num_docs": 6, "docs": [{"author": "A"}, {"author": "B"}]}',
+        '{"num_docs": 6, "docs": [{"author": "C"}, {"author": "D"}]}',
+        '{"num_docs": 6, "docs": [{"author": "E"}, {"author": "F"}]}',
+    ]
+
+
+def test_quando_registrar_pagina_deve_estar_concluida(tmp_path):
+    with Manifesto(str(tmp_path / "manifesto.tsv")) as manifesto:
+        manifesto.definir_total("q=Python", 3)
+        manifesto.registrar("q=Python", 1, "pagina 1")
+        assert manifesto.total_de_paginas("q=Python") == 3
+        assert manifesto.concluida("q=Python", 1)
+        assert manifesto.concluida("q=Python", 1, "pagina 1")
+        assert not manifesto.concluida("q=Python", 1, "pagina alterada")
+        assert not manifesto.concluida("q=Python", 2)
+
+
+def test_quando_reabrir_deve_recuperar_o_registro(tmp_path):
+    caminho = str(tmp_path / "manifesto.tsv")
+    with Manifesto(caminho) as manifesto:
+        manifesto.definir_total("q=Python", 3)
+        manifesto.registrar("q=Python", 1, "pagina 1")
+        manifesto.registrar("q=Python", 3, "pagina 3")
+    with open(caminho, "a") as fp:
+        fp.write("pagina\tq=Python\t2")
+    with Manifesto(caminho) as manifesto:
+        assert manifesto.total_de_paginas("q=Python") == 3
+        assert manifesto.paginas_concluidas("q=Python") == [1, 3]
+        manifesto.registrar("q=Python", 2, "pagina 2")
+    with Manifesto(caminho) as manifesto:
+        assert manifesto.paginas_concluidas("q=Python") == [1, 2, 3]
+
+
+@patch("colecao.livros.executar_requisicao")
+def test_quando_retomar_baixar_livros_deve_baixar_so_a_pagina_que_falhou(stub_executar_requisicao, paginas, tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    arquivo = [str(tmp_path / f"pagina{i}.json") for i in range(1, 4)]
+    caminho = str(tmp_path / "manifesto.tsv")
+    stub_executar_requisicao.side_effect = [paginas[0], None, paginas[2]]
+    with Manifesto(caminho) as manifesto:
+        baixar_livros(arquivo, None, None, "Python", manifesto=manifesto)
+
+    stub_executar_requisicao.reset_mock(side_effect=True)
+    stub_executar_requisicao.side_effect = [paginas[1]]
+    with Manifesto(caminho) as manifesto:
+        baixar_livros(arquivo, None, None, "Python", manifesto=manifesto)
+        assert manifesto.paginas_concluidas("q=Python") == [1, 2, 3]
+    assert stub_executar_requisicao.call_args_list == [
+        call("https://buscarlivros?q=Python&page=2"),
+    ]
+    assert [open(a).read() for a in arquivo] == paginas
+
+
+@patch("colecao.livros.executar_requisicao")
+def test_quando_arquivo_gravado_foi_alterado_deve_baixar_de_novo(stub_executar_requisicao, paginas, tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    arquivo = [str(tmp_path / f"pagina{i}.json") for i in range(1, 4)]
+    caminho = str(tmp_path / "manifesto.tsv")
+    stub_executar_requisicao.side_effect = paginas
+    with Manifesto(caminho) as manifesto:
+        baixar_livros(arquivo, None, None, "Python", manifesto=manifesto)
+    with open(arquivo[0], "w") as fp:
+        fp.write('{"num_docs": 6, "docs": [')
+
+    stub_executar_requisicao.reset_mock(side_effect=True)
+    stub_executar_requisicao.side_effect = [paginas[0]]
+    with Manifesto(caminho) as manifesto:
+        baixar_livros(arquivo, None, None, "Python", trabalhadores=4,
+                      manifesto=manifesto)
+    assert stub_executar_requisicao.call_args_list == [
+        call("https://buscarlivros?q=Python&page=1"),
+    ]
+    assert open(arquivo[0]).read() == paginas[0]
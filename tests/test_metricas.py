@@ -0,0 +1,84 @@
+import json
+import pytest
+from unittest.mock import patch
+from colecao.metricas import (Histograma,
+                              Metricas,
+                              definir_metricas_globais,
+                              instrumentar,
+                              )
+from colecao.livros import (executar_requisicao,
+                            escrever_em_arquivo,
+                            registrar_livros,
+                            Resposta,
+                            )
+from test_livros import StubHTTPResponse
+
+
+@pytest.fixture
+def metricas():
+    metricas = Metricas()
+    definir_metricas_globais(metricas)
+    yield metricas
+    definir_metricas_globais(None)
+
+
+def test_quando_observar_histograma_deve_contar_na_faixa_certa():
+    histograma = Histograma(limites=(0.01, 0.1, 1.0))
+    for valor in (0.005, 0.01, 0.05, 0.5, 5.0):
+        histograma.observar(valor)
+    assert histograma.contagens == [2, 1, 1, 1]
+    assert histograma.quantidade == 5
+    assert histograma.percentil(50) == 0.1
+    assert histograma.percentil(100) == float("inf")
+
+
+def test_quando_metricas_desligadas_nao_deve_observar():
+    metricas = Metricas()
+    with patch.object(metricas, "observar") as spy_observar:
+        assert instrumentar("etapa")(lambda x: x * 2)(21) == 42
+    spy_observar.assert_not_called()
+
+
+def test_quando_executar_etapas_deve_registrar_latencia_e_contadores(metricas, tmp_path):
+    conteudo = '{"num_docs": 2, "docs": [{"author": "A"}, {"author": "B"}]}'
+    arquivo = str(tmp_path / "pagina1.json")
+    with patch("colecao.livros.urlopen", return_value=StubHTTPResponse(conteudo.encode())):
+        executar_requisicao("https://buscarlivros?page=1")
+    escrever_em_arquivo(arquivo, conteudo)
+    assert registrar_livros([arquivo], len) == 2
+    instantaneo = metricas.instantaneo()
+    assert instantaneo["requisicao"]["bytes"] == len(conteudo)
+    assert instantaneo["escrita"]["bytes"] == len(conteudo)
+    assert instantaneo["decodificacao"]["chamadas"] == 1
+    assert instantaneo["insercao"]["documentos"] == 2
+    assert instantaneo["insercao"]["latencia"]["quantidade"] == 1
+
+
+def test_quando_requisicao_falha_deve_contar_erro(metricas):
+    with patch("colecao.livros.urlopen", side_effect=ValueError()):
+        with pytest.raises(ValueError):
+            executar_requisicao("https://buscarlivros?page=1")
+    Resposta("{invalido").dados
+    instantaneo = metricas.instantaneo()
+    assert instantaneo["requisicao"]["erros"] == 1
+    assert instantaneo["decodificacao"]["erros"] == 1
+
+
+def test_quando_registrar_callback_deve_receber_cada_observacao(metricas):
+    observacoes = []
+    metricas.ao_observar(lambda etapa, segundos, contadores: observacoes.append((etapa, contadores)))
+    Resposta('{"docs": []}').dados
+    assert observacoes == [("decodificacao", {"bytes": 12})]
+
+
+def test_quando_exportar_deve_gerar_json_e_texto_do_prometheus():
+    metricas = Metricas(limites=(0.1, 1.0))
+    metricas.observar("escrita", 0.05, bytes=10)
+    metricas.observar("escrita", 0.5, bytes=20)
+    assert json.loads(metricas.para_json())["escrita"]["bytes"] == 30
+    texto = metricas.para_prometheus()
+    assert 'colecao_latencia_segundos_bucket{etapa="escrita",le="0.1"} 1' in texto
+    assert 'colecao_latencia_segundos_bucket{etapa="escrita",le="+Inf"} 2' in texto
+    assert 'colecao_latencia_segundos_count{etapa="escrita"} 2' in texto
+    assert 'colecao_bytes_total{etapa="escrita"} 30' in texto
+    assert "# TYPE colecao_chamadas_total counter" in texto
@@ -0,0 +1,127 @@
+import os
+import pstats
+import pytest
+import sys
+import threading
+from unittest.mock import patch
+from colecao.cli import main
+from colecao.perfil import Perfil, perfilar
+from colecao.livros import baixar_livros, registrar_livros, escrever_em_arquivo, Resposta
+
+
+@pytest.fixture
+def arquivos(tmp_path):
+    arquivos = [str(tmp_path / f"pagina{i}.json") for i in range(2)]
+    for arquivo in arquivos:
+        escrever_em_arquivo(arquivo, '{"num_docs": 4, "docs": [{"author": "A"}, {"author": "B"}]}')
+    return arquivos
+
+
+def test_quando_ambiente_sem_colecao_perfil_nao_deve_perfilar():
+    assert Perfil.do_ambiente({}) is None
+    assert Perfil.do_ambiente({"COLECAO_PERFIL": "0"}) is None
+
+
+def test_quando_ambiente_pede_cpu_e_memoria_deve_configurar_perfil():
+    perfil = Perfil.do_ambiente({
+        "COLECAO_PERFIL": "cpu, memoria",
+        "COLECAO_PERFIL_DIRETORIO": "/tmp/perfis",
+        "COLECAO_PERFIL_AMOSTRAGEM": "0.1",
+        "COLECAO_PERFIL_TOP": "5",
+    })
+    assert (perfil.cpu, perfil.memoria) == (True, True)
+    assert (perfil.diretorio, perfil.amostragem, perfil.top) == ("/tmp/perfis", 0.1, 5)
+
+
+def test_quando_registrar_livros_com_perfil_deve_gravar_pstats_e_relatorio_de_memoria(tmp_path, arquivos):
+    perfil = Perfil(memoria=True, diretorio=str(tmp_path / "perfis"), top=3)
+    assert registrar_livros(arquivos, len, perfil=perfil) == 4
+    pstats_, memoria = perfil.arquivos
+    assert pstats_.endswith(".pstats")
+    funcoes = {funcao for _, _, funcao in pstats.Stats(pstats_).stats}
+    assert "registrar_livros" in funcoes
+    linhas = open(memoria).read().splitlines()
+    assert linhas[0].startswith("Memoria rastreada: atual")
+    assert len(linhas) <= 2 + 3
+
+
+@patch("colecao.livros.executar_requisicao")
+def test_quando_colecao_perfil_no_ambiente_baixar_livros_deve_ser_perfilado(stub_executar_requisicao, tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    stub_executar_requisicao.return_value = '{"num_docs": 2, "docs": [{"author": "A"}, {"author": "B"}]}'
+    diretorio = tmp_path / "perfis"
+    ambiente = {"COLECAO_PERFIL": "1", "COLECAO_PERFIL_DIRETORIO": str(diretorio)}
+    with patch.dict(os.environ, ambiente):
+        baixar_livros([str(tmp_path / "pagina1.json")], None, None, "Python")
+    assert [p.suffix for p in diretorio.iterdir()] == [".pstats"]
+
+
+@patch("colecao.livros.executar_requisicao")
+def test_quando_baixar_livros_com_trabalhadores_deve_perfilar_as_threads(stub_executar_requisicao, tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    stub_executar_requisicao.return_value = '{"num_docs": 6, "docs": [{"author": "A"}, {"author": "B"}]}'
+    perfil = Perfil(diretorio=str(tmp_path / "perfis"))
+    arquivos = [str(tmp_path / f"pagina{i}.json") for i in range(3)]
+    baixar_livros(arquivos, None, None, "Python", trabalhadores=2, perfil=perfil)
+    funcoes = {funcao for _, _, funcao in pstats.Stats(perfil.arquivos[0]).stats}
+    assert {"baixar_livros", "baixar_pagina"} <= funcoes
+
+
+@patch("colecao.lote.executar_requisicao")
+def test_quando_colecao_perfil_no_ambiente_baixar_lote_deve_ser_perfilado(stub_executar_requisicao, tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    stub_executar_requisicao.return_value = '{"num_docs": 2, "docs": [{"author": "A"}, {"author": "B"}]}'
+    diretorio = tmp_path / "perfis"
+    ambiente = {"COLECAO_PERFIL": "1", "COLECAO_PERFIL_DIRETORIO": str(diretorio)}
+    with patch.dict(os.environ, ambiente):
+        main(["baixar", "--livre", "Python", "--destino", str(tmp_path / "paginas"),
+              "--silencioso"])
+    arquivos = list(diretorio.iterdir())
+    assert [p.name.split("-")[0] for p in arquivos] == ["baixar_lote"]
+    funcoes = {funcao for _, _, funcao in pstats.Stats(str(arquivos[0])).stats}
+    assert "baixar_pagina_do_lote" in funcoes
+
+
+def test_quando_outra_thread_inicia_durante_o_perfil_nao_deve_ser_perfilada(tmp_path):
+    iniciada = threading.Event()
+    terminar = threading.Event()
+    perfis = []
+
+    def trabalhar():
+        iniciada.set()
+        terminar.wait(timeout=5)
+        perfis.append(sys.getprofile())
+
+    with perfilar("externo", Perfil(diretorio=str(tmp_path))):
+        thread = threading.Thread(target=trabalhar)
+        thread.start()
+        iniciada.wait(timeout=5)
+    terminar.set()
+    thread.join()
+    assert perfis == [None]
+
+
+def test_quando_amostragem_nao_sorteia_nao_deve_perfilar(tmp_path, arquivos):
+    perfil = Perfil(diretorio=str(tmp_path / "perfis"), amostragem=0.5)
+    with patch("colecao.perfil.random.random", return_value=0.9):
+        registrar_livros(arquivos, len, perfil=perfil)
+    assert perfil.arquivos == []
+
+
+def test_quando_perfis_aninhados_so_o_externo_deve_perfilar(tmp_path):
+    externo = Perfil(diretorio=str(tmp_path))
+    interno = Perfil(diretorio=str(tmp_path))
+    with perfilar("externo", externo) as ativo:
+        assert ativo is externo
+        with perfilar("interno", interno) as ativo:
+            assert ativo is None
+    assert len(externo.arquivos) == 1
+    assert interno.arquivos == []
+
+
+def test_quando_execucao_perfilada_levanta_erro_deve_propagar(tmp_path):
+    perfil = Perfil(diretorio=str(tmp_path))
+    with pytest.raises(OSError):
+        with perfilar("falha", perfil):
+            raise OSError()
+    assert len(perfil.arquivos) == 1
@@ -0,0 +1,147 @@
+import pytest
+import threading
+from email.message import Message
+from unittest.mock import patch, call
+from urllib.error import HTTPError, URLError
+from http.client import IncompleteRead
+from colecao.resiliencia import PoliticaDeRetentativa, ControleDeConcorrencia
+from colecao.livros import executar_requisicao
+from test_livros import StubHTTPResponse
+
+
+def http_error(codigo, retry_after=None):
+    cabecalhos = Message()
+    if retry_after is not None:
+        cabecalhos["Retry-After"] = retry_after
+    return HTTPError("https://buscador", codigo, "erro", cabecalhos, None)
+
+
+def test_quando_erro_4xx_nao_deve_repetir():
+    politica = PoliticaDeRetentativa()
+    assert not politica.deve_repetir(http_error(404), 0)
+    assert politica.deve_repetir(http_error(500), 0)
+    assert politica.deve_repetir(http_error(429), 0)
+    assert politica.deve_repetir(URLError("sem rede"), 0)
+
+
+def test_quando_esgotar_as_tentativas_nao_deve_repetir():
+    politica = PoliticaDeRetentativa(tentativas=3)
+    assert politica.deve_repetir(http_error(503), 1)
+    assert not politica.deve_repetir(http_error(503), 2)
+
+
+def test_quando_sem_jitter_a_espera_deve_dobrar_ate_o_maximo():
+    politica = PoliticaDeRetentativa(espera_base=1, espera_maxima=5, jitter=False)
+    assert [politica.espera(t) for t in range(4)] == [1, 2, 4, 5]
+
+
+def test_quando_com_jitter_a_espera_deve_ficar_entre_zero_e_o_limite():
+    politica = PoliticaDeRetentativa(espera_base=1, espera_maxima=5)
+    assert all(0 <= politica.espera(2) <= 4 for _ in range(100))
+
+
+def test_quando_sobrecarga_com_retry_after_deve_esperar_o_pedido():
+    politica = PoliticaDeRetentativa(espera_maxima=60)
+    assert politica.espera(0, http_error(429, "7")) == 7
+    assert politica.espera(0, http_error(503, "120")) == 60
+    assert politica.espera(0, http_error(503, "Wed, 21 Oct 2015 07:28:00 GMT")) == 0
+
+
+@patch("colecao.livros.time.sleep")
+@patch("colecao.livros.urlopen")
+def test_quando_executar_requisicao_com_politica_deve_repetir_ate_conseguir(stub_urlopen, spy_sleep):
+    stub_urlopen.side_effect = [
+        http_error(503, "2"), URLError("sem rede"), StubHTTPResponse(b"conteudo"),
+    ]
+    politica = PoliticaDeRetentativa(espera_base=1, jitter=False)
+    assert executar_requisicao("https://buscador", politica=politica) == "conteudo"
+    assert spy_sleep.call_args_list == [call(2.0), call(2)]
+
+
+@patch("colecao.livros.time.sleep")
+@patch("colecao.livros.urlopen")
+def test_quando_executar_requisicao_esgota_tentativas_deve_logar_url_error(stub_urlopen, spy_sleep, caplog):
+    stub_urlopen.side_effect = URLError("mensagem de erro")
+    politica = PoliticaDeRetentativa(tentativas=3)
+    assert executar_requisicao("https://buscador", politica=politica) is None
+    assert stub_urlopen.call_count == 3
+    assert len(caplog.records) == 1
+    assert "mensagem de erro" in caplog.records[0].message
+
+
+class StubRespostaQueFalhaNaLeitura(StubHTTPResponse):
+    def __init__(self, erro):
+        super().__init__()
+        self._erro = erro
+
+    def read(self, tamanho=-1):
+        raise self._erro
+
+
+@pytest.mark.parametrize("erro", [
+    TimeoutError("timed out"),
+    ConnectionResetError("reset"),
+    IncompleteRead(b"parcial"),
+])
+@patch("colecao.livros.time.sleep")
+@patch("colecao.livros.urlopen")
+def test_quando_leitura_da_resposta_falha_com_politica_deve_repetir(stub_urlopen, spy_sleep, erro, caplog):
+    stub_urlopen.side_effect = [
+        StubRespostaQueFalhaNaLeitura(erro), StubHTTPResponse(b"conteudo"),
+    ]
+    assert executar_requisicao("https://buscador", politica=PoliticaDeRetentativa(3)) == "conteudo"
+    assert stub_urlopen.call_count == 2
+
+    stub_urlopen.reset_mock(side_effect=True)
+    stub_urlopen.return_value = StubRespostaQueFalhaNaLeitura(erro)
+    assert executar_requisicao("https://buscador", politica=PoliticaDeRetentativa(3)) is None
+    assert stub_urlopen.call_count == 3
+    assert len(caplog.records) == 1
+
+
+@patch("colecao.livros.urlopen", return_value=StubRespostaQueFalhaNaLeitura(TimeoutError()))
+def test_quando_leitura_da_resposta_falha_sem_politica_deve_levantar(stub_urlopen):
+    with pytest.raises(TimeoutError):
+        executar_requisicao("https://buscador")
+
+
+def test_quando_sucesso_o_limite_deve_crescer_aos_poucos():
+    controle = ControleDeConcorrencia(inicial=2, maximo=3)
+    for _ in range(2):
+        controle.sucesso()
+    assert controle.limite == 2
+    controle.sucesso()
+    assert controle.limite == 3
+    for _ in range(10):
+        controle.sucesso()
+    assert controle.limite == 3
+
+
+def test_quando_sobrecarga_o_limite_deve_cair_pela_metade():
+    controle = ControleDeConcorrencia(inicial=8, minimo=1)
+    controle.sobrecarga()
+    assert controle.limite == 4
+    for _ in range(5):
+        controle.sobrecarga()
+    assert controle.limite == 1
+
+
+def test_quando_limite_atingido_adquirir_deve_aguardar():
+    controle = ControleDeConcorrencia(inicial=1)
+    controle.adquirir()
+    adquiriu = threading.Event()
+    thread = threading.Thread(target=lambda: controle.adquirir() or adquiriu.set())
+    thread.start()
+    assert not adquiriu.wait(0.05)
+    controle.liberar()
+    assert adquiriu.wait(1)
+    thread.join()
+
+
+@patch("colecao.livros.urlopen")
+def test_quando_executar_requisicao_recebe_429_deve_reduzir_o_controle(stub_urlopen):
+    stub_urlopen.side_effect = http_error(429)
+    controle = ControleDeConcorrencia(inicial=8)
+    executar_requisicao("https://buscador", controle=controle)
+    assert controle.limite == 4
+    assert controle.em_andamento == 0
@@ -0,0 +1,83 @@
+import os
+from unittest.mock import patch
+from colecao.segmentos import ArmazemDeSegmentos
+from colecao.livros import baixar_livros, registrar_livros, Consulta, Resposta
+
+
+def test_quando_gravar_paginas_deve_ler_cada_uma_diretamente(tmp_path):
+    with ArmazemDeSegmentos(tmp_path) as armazem:
+        armazem.gravar("q=Python", 1, "pagina 1")
+        armazem.gravar("q=Python", 2, "pagina 2")
+        armazem.gravar("autor=Nilo", 1, "outra consulta")
+        assert armazem.ler("q=Python", 2) == "pagina 2"
+        assert armazem.ler("autor=Nilo", 1) == "outra consulta"
+        assert armazem.ler("q=Python", 3) is None
+        assert len(armazem) == 3
+    assert sorted(os.listdir(tmp_path)) == ["indice.tsv", "segmento-000001.dat"]
+
+
+def test_quando_segmento_enche_deve_comecar_outro(tmp_path):
+    with ArmazemDeSegmentos(tmp_path, tamanho_do_segmento=10) as armazem:
+        for pagina in range(1, 4):
+            armazem.gravar("q=Python", pagina, f"pagina {pagina}")
+        assert list(armazem) == [
+            ("q=Python", 1, "pagina 1"),
+            ("q=Python", 2, "pagina 2"),
+            ("q=Python", 3, "pagina 3"),
+        ]
+    assert sorted(os.listdir(tmp_path)) == [
+        "indice.tsv",
+        "segmento-000001.dat",
+        "segmento-000002.dat",
+        "segmento-000003.dat",
+    ]
+
+
+def test_quando_reabrir_deve_encontrar_as_paginas_e_continuar_gravando(tmp_path):
+    with ArmazemDeSegmentos(tmp_path) as armazem:
+        armazem.gravar("q=Python", 1, "pagina 1")
+    with ArmazemDeSegmentos(tmp_path) as armazem:
+        armazem.gravar("q=Python", 2, "pagina 2")
+        assert list(armazem.conteudos()) == ["pagina 1", "pagina 2"]
+        assert ("q=Python", 1) in armazem
+
+
+def test_quando_indice_tem_linha_interrompida_deve_ignora_la(tmp_path):
+    with ArmazemDeSegmentos(tmp_path) as armazem:
+        armazem.gravar("q=Python", 1, "pagina 1")
+    with open(tmp_path / "indice.tsv", "a") as fp:
+        fp.write("q=Python\t2\t1")
+    with ArmazemDeSegmentos(tmp_path) as armazem:
+        assert armazem.paginas() == [("q=Python", 1)]
+        armazem.gravar("q=Python", 2, "pagina 2")
+    with ArmazemDeSegmentos(tmp_path) as armazem:
+        assert armazem.ler("q=Python", 2) == "pagina 2"
+
+
+@patch("colecao.livros.executar_requisicao")
+def test_quando_baixar_livros_com_armazem_nao_precisa_de_arquivos(stub_executar_requisicao, tmp_path):
+    paginas = [
+        '{"num_docs": 4, "docs": [{"author": "A"}, {"author": "B"}]}',
+        '{"num_docs": 4, "docs": [{"author": "C"}, {"author": "D"}]}',
+    ]
+    stub_executar_requisicao.side_effect = paginas
+    Resposta.quantidade_documentos_por_pagina = 2
+    with ArmazemDeSegmentos(tmp_path) as armazem:
+        baixar_livros(None, None, None, "Python", armazem=armazem)
+        assert armazem.ler("q=Python", 1) == paginas[0]
+        assert armazem.ler("q=Python", 2) == paginas[1]
+        documentos = []
+        quantidade = registrar_livros(
+            armazem, lambda docs: documentos.extend(docs) or len(docs)
+        )
+    assert quantidade == 4
+    assert documentos == [
+        {"author": "A"}, {"author": "B"}, {"author": "C"}, {"author": "D"},
+    ]
+
+
+def test_quando_consultas_iguais_a_chave_deve_ser_a_mesma():
+    consulta = Consulta("Nilo Neil", "Python", None)
+    consulta.seguinte
+    assert consulta.chave == Consulta("Nilo Neil", "Python", None).chave
+    assert consulta.chave == "autor=Nilo+Neil&title=Python"
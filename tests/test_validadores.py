@@ -0,0 +1,152 @@
+from email.message import Message
+import json
+import os
+import threading
+from unittest.mock import patch
+from urllib.error import HTTPError
+from colecao.validadores import RepositorioDeValidadores
+from colecao.livros import executar_requisicao, baixar_livros, escrever_em_arquivo, Resposta
+from colecao.lote import baixar_lote
+from colecao.manifesto import Manifesto
+from test_livros import StubHTTPResponse
+
+
+def nao_modificado(url, timeout):
+    raise HTTPError(url.full_url, 304, "Not Modified", Message(), None)
+
+
+def test_quando_nada_foi_guardado_nao_deve_enviar_cabecalhos(tmp_path):
+    validadores = RepositorioDeValidadores(tmp_path)
+    assert validadores.cabecalhos("https://buscarlivros?q=Python") == {}
+    assert validadores.conteudo("https://buscarlivros?q=Python") is None
+
+
+def test_quando_resposta_tem_etag_e_last_modified_deve_enviar_os_dois(tmp_path):
+    validadores = RepositorioDeValidadores(tmp_path)
+    cabecalhos = StubHTTPResponse(b"", ETag='"v1"', Last_Modified="Wed, 21 Oct 2015 07:28:00 GMT").headers
+    validadores.guardar("https://buscarlivros?q=Python", cabecalhos, "conteudo")
+    assert RepositorioDeValidadores(tmp_path).cabecalhos("https://buscarlivros?q=Python") == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }
+
+
+def test_quando_resposta_nao_tem_validadores_nao_deve_guardar(tmp_path):
+    validadores = RepositorioDeValidadores(tmp_path)
+    validadores.guardar("https://buscarlivros?q=Python", Message(), "conteudo")
+    assert validadores.conteudo("https://buscarlivros?q=Python") is None
+
+
+def test_quando_threads_guardam_a_mesma_url_nao_devem_compartilhar_o_temporario(tmp_path):
+    validadores = RepositorioDeValidadores(tmp_path)
+    url = "https://buscarlivros?q=Python"
+    barreira = threading.Barrier(2)
+    dump = json.dump
+    erros = []
+
+    def dump_simultaneo(registro, fp):
+        dump(registro, fp)
+        barreira.wait(timeout=5)
+
+    def guardar(conteudo):
+        try:
+            validadores.guardar(url, {"ETag": '"v1"'}, conteudo)
+        except OSError as e:
+            erros.append(e)
+
+    with patch("colecao.validadores.json.dump", dump_simultaneo):
+        threads = [threading.Thread(target=guardar, args=(conteudo,))
+                   for conteudo in ("um", "dois")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert erros == []
+    assert validadores.conteudo(url) in ("um", "dois")
+    assert [p.suffix for p in tmp_path.iterdir()] == [".json"]
+
+
+def test_quando_servidor_responde_304_deve_retornar_o_conteudo_guardado(tmp_path):
+    validadores = RepositorioDeValidadores(tmp_path)
+    url = "https://buscarlivros?q=Python&page=1"
+    with patch("colecao.livros.urlopen", return_value=StubHTTPResponse(b"conteudo", ETag='"v1"')):
+        primeiro = executar_requisicao(url, validadores=validadores)
+    with patch("colecao.livros.urlopen", side_effect=nao_modificado) as spy_urlopen:
+        segundo = executar_requisicao(url, validadores=validadores)
+    pedido = spy_urlopen.call_args.args[0]
+    assert pedido.get_header("If-none-match") == '"v1"'
+    assert primeiro == segundo == "conteudo"
+    assert not getattr(primeiro, "nao_modificado", False)
+    assert segundo.nao_modificado
+
+
+PAGINAS = [
+    b'{"num_docs": 4, "docs": [{"author": "A"}, {"author": "B"}]}',
+    b'{"num_docs": 4, "docs": [{"author": "C"}, {"author": "D"}]}',
+]
+
+
+def urlopen_com_etag(pedido, timeout):
+    pagina = int(pedido.full_url.rsplit("=", 1)[1])
+    return StubHTTPResponse(PAGINAS[pagina - 1], ETag=f'"{pagina}"')
+
+
+def test_quando_pagina_nao_foi_modificada_nao_deve_regravar(tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    validadores = RepositorioDeValidadores(tmp_path / "validadores")
+    arquivo = [str(tmp_path / "pagina1.json"), str(tmp_path / "pagina2.json")]
+    with patch("colecao.livros.urlopen", urlopen_com_etag):
+        baixar_livros(arquivo, None, None, "Python", validadores=validadores)
+
+    respostas = [None, StubHTTPResponse(PAGINAS[1] + b" ", ETag='"novo"')]
+
+    def urlopen(pedido, timeout):
+        resposta = respostas.pop(0)
+        return resposta or nao_modificado(pedido, timeout)
+
+    with patch("colecao.livros.urlopen", urlopen), \
+            patch("colecao.livros.escrever_em_arquivo", wraps=escrever_em_arquivo) as spy_escrever:
+        baixar_livros(arquivo, None, None, "Python", validadores=validadores)
+    spy_escrever.assert_called_once_with(arquivo[1], PAGINAS[1].decode() + " ")
+
+
+def test_quando_arquivo_foi_apagado_e_servidor_responde_304_deve_regravar(tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    validadores = RepositorioDeValidadores(tmp_path / "validadores")
+    arquivo = [str(tmp_path / "pagina1.json"), str(tmp_path / "pagina2.json")]
+    caminho = str(tmp_path / "manifesto.tsv")
+    with patch("colecao.livros.urlopen", urlopen_com_etag), Manifesto(caminho) as manifesto:
+        baixar_livros(arquivo, None, None, "Python",
+                      validadores=validadores, manifesto=manifesto)
+    os.remove(arquivo[1])
+
+    with patch("colecao.livros.urlopen", side_effect=nao_modificado) as spy_urlopen:
+        with Manifesto(caminho) as manifesto:
+            baixar_livros(arquivo, None, None, "Python",
+                          validadores=validadores, manifesto=manifesto)
+        assert spy_urlopen.call_count == 1
+        assert open(arquivo[1]).read() == PAGINAS[1].decode()
+
+        spy_urlopen.reset_mock()
+        with Manifesto(caminho) as manifesto:
+            baixar_livros(arquivo, None, None, "Python",
+                          validadores=validadores, manifesto=manifesto)
+        spy_urlopen.assert_not_called()
+
+
+def test_quando_baixar_lote_em_diretorio_novo_e_servidor_responde_304_deve_gravar(tmp_path):
+    Resposta.quantidade_documentos_por_pagina = 2
+    validadores = RepositorioDeValidadores(tmp_path / "validadores")
+
+    def arquivo(destino):
+        return lambda chave, pagina: str(tmp_path / destino / f"pagina{pagina}.json")
+
+    with patch("colecao.livros.urlopen", urlopen_com_etag):
+        baixar_lote([(None, None, "Python")], arquivo=arquivo("primeiro"),
+                    validadores=validadores)
+    with patch("colecao.livros.urlopen", side_effect=nao_modificado):
+        baixar_lote([(None, None, "Python")], arquivo=arquivo("segundo"),
+                    validadores=validadores)
+    assert [open(arquivo("segundo")("q=Python", pagina)).read() for pagina in (1, 2)] == [
+        pagina.decode() for pagina in PAGINAS
+    ]